@@ -0,0 +1,215 @@
+from http import HTTPStatus
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'api',
+    }
+})
+class PostsApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Тестовая группа',
+                                         slug='test_slug',
+                                         description='Тестовое описание')
+        cls.extra_posts = 5
+        Post.objects.bulk_create(
+            Post(author=cls.author, group=cls.group, text=f'Пост {number}')
+            for number in range(settings.API_PAGE_SIZE + cls.extra_posts)
+        )
+        cls.own_post = Post.objects.create(author=cls.user, text='Свой пост')
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(PostsApiTests.user)
+
+    def test_posts_cursor_pagination(self):
+        """Проверяем, что посты отдаются страницами по курсору."""
+
+        url = reverse('api:posts')
+        first = self.guest_client.get(url).json()
+        self.assertEqual(len(first['results']), settings.API_PAGE_SIZE)
+        self.assertEqual(first['results'][0]['id'],
+                         PostsApiTests.own_post.pk)
+        self.assertIsNone(first['previous'])
+        second = self.guest_client.get(first['next']).json()
+        self.assertEqual(len(second['results']),
+                         PostsApiTests.extra_posts + 1)
+        self.assertIsNone(second['next'])
+        ids = [item['id'] for item in first['results'] + second['results']]
+        self.assertEqual(ids, list(Post.objects.order_by(
+            '-pub_date', '-id'
+        ).values_list('id', flat=True)))
+        back = self.guest_client.get(second['previous']).json()
+        self.assertEqual(back['results'], first['results'])
+
+    def test_sparse_fields_without_models(self):
+        """Проверяем, что ?fields= ограничивает поля, а строки
+        сериализуются без создания моделей."""
+
+        url = reverse('api:posts') + '?fields=id,author,group'
+        with mock.patch.object(Post, 'from_db') as from_db, \
+                mock.patch.object(User, 'from_db') as user_from_db, \
+                CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(url).json()
+        from_db.assert_not_called()
+        user_from_db.assert_not_called()
+        self.assertTrue(any('JOIN "auth_user"' in query['sql']
+                            for query in queries))
+        self.assertEqual(response['results'][0], {
+            'id': PostsApiTests.own_post.pk, 'author': 'test', 'group': None
+        })
+        self.assertIn('fields=id%2Cauthor%2Cgroup&before=', response['next'])
+        bad = self.guest_client.get(reverse('api:posts') + '?fields=email')
+        self.assertEqual(bad.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_group_and_profile_posts(self):
+        """Проверяем ленты группы и автора и ответ 404 в JSON."""
+
+        urls = {
+            reverse('api:group_posts', kwargs={'slug': 'test_slug'}):
+                settings.API_PAGE_SIZE,
+            reverse('api:profile_posts', kwargs={'username': 'test'}): 1,
+        }
+        for url, count in urls.items():
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(len(response.json()['results']), count)
+        for url in (reverse('api:group_posts', kwargs={'slug': 'missing'}),
+                    reverse('api:profile_posts',
+                            kwargs={'username': 'missing'})):
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+                self.assertIn('detail', response.json())
+
+    def test_feed(self):
+        """Проверяем, что лента подписок доступна только вошедшему
+        и содержит посты авторов, на которых он подписан."""
+
+        url = reverse('api:feed') + '?fields=author'
+        response = self.guest_client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
+        results = self.authorized_client.get(url).json()['results']
+        self.assertEqual(len(results), settings.API_PAGE_SIZE)
+        self.assertEqual({item['author'] for item in results}, {'author'})
+
+    def test_etag(self):
+        """Проверяем, что неизменная лента отвечает 304, а новый пост
+        меняет ETag."""
+
+        url = reverse('api:posts')
+        etag = self.guest_client.get(url)['ETag']
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        Post.objects.create(author=PostsApiTests.user, text='Новый пост')
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.json()['results'][0]['text'], 'Новый пост')
+
+    def test_etag_comments_count(self):
+        """Проверяем, что новый комментарий меняет ETag лент
+        с comments_count, а ETag без этого поля остается прежним."""
+
+        post = Post.objects.filter(group=PostsApiTests.group).first()
+        urls = {
+            reverse('api:posts'): True,
+            reverse('api:group_posts', kwargs={'slug': 'test_slug'}): True,
+            reverse('api:profile_posts', kwargs={'username': 'author'}):
+                True,
+            reverse('api:posts') + '?fields=id,text': False,
+        }
+        etags = {url: self.guest_client.get(url)['ETag'] for url in urls}
+        feed_etag = self.authorized_client.get(reverse('api:feed'))['ETag']
+        Comment.objects.create(post=post, author=PostsApiTests.user,
+                               text='Комментарий')
+        for url, changed in urls.items():
+            with self.subTest(url=url):
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url]
+                )
+                if not changed:
+                    self.assertEqual(response.status_code,
+                                     HTTPStatus.NOT_MODIFIED)
+                    continue
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                item = next(item for item in response.json()['results']
+                            if item['id'] == post.pk)
+                self.assertEqual(item['comments_count'], 1)
+        response = self.authorized_client.get(
+            reverse('api:feed'), HTTP_IF_NONE_MATCH=feed_etag
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_posts_batch(self):
+        """Проверяем, что посты с авторами и группами читаются одним
+        запросом, а неизвестные id попадают в missing."""
+
+        posts = list(Post.objects.filter(group=PostsApiTests.group)[:3])
+        ids = [posts[2].pk, 0, posts[0].pk, PostsApiTests.own_post.pk]
+        url = (reverse('api:posts_batch') + '?ids='
+               + ','.join(str(pk) for pk in ids))
+        with self.assertNumQueries(1):
+            response = self.guest_client.get(url).json()
+        self.assertEqual([item['id'] for item in response['results']],
+                         [posts[2].pk, posts[0].pk,
+                          PostsApiTests.own_post.pk])
+        self.assertEqual(response['missing'], [0])
+        self.assertEqual(response['results'][0]['author']['username'],
+                         'author')
+        self.assertEqual(response['results'][0]['group']['slug'],
+                         'test_slug')
+        self.assertIsNone(response['results'][2]['group'])
+
+    def test_users_and_groups_batch(self):
+        """Проверяем пакетное чтение авторов и групп."""
+
+        cases = (
+            (reverse('api:users_batch') + '?usernames=author,missing,test',
+             'username', ['author', 'test']),
+            (reverse('api:groups_batch') + '?slugs=missing,test_slug',
+             'slug', ['test_slug']),
+        )
+        for url, key, expected in cases:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url).json()
+                self.assertEqual(
+                    [item[key] for item in response['results']], expected
+                )
+                self.assertEqual(response['missing'], ['missing'])
+
+    def test_batch_limits(self):
+        """Проверяем, что пустой, слишком длинный или неверный список
+        ключей отклоняется."""
+
+        too_many = ','.join(
+            str(pk) for pk in range(1, settings.API_BATCH_LIMIT + 2)
+        )
+        for query in ('', '?ids=', f'?ids={too_many}', '?ids=1,abc',
+                      f'?ids=1,{2 ** 63}', f'?ids={-2 ** 63 - 1}'):
+            with self.subTest(query=query):
+                response = self.guest_client.get(
+                    reverse('api:posts_batch') + query
+                )
+                self.assertEqual(response.status_code,
+                                 HTTPStatus.BAD_REQUEST)
@@ -0,0 +1,18 @@
+from django.urls import path
+
+from . import views
+
+
+app_name = 'api'
+
+urlpatterns = [
+    path('posts/', views.posts, name='posts'),
+    path('posts/batch/', views.posts_batch, name='posts_batch'),
+    path('users/batch/', views.users_batch, name='users_batch'),
+    path('groups/batch/', views.groups_batch, name='groups_batch'),
+    path('groups/<slug:slug>/posts/', views.group_posts,
+         name='group_posts'),
+    path('profiles/<str:username>/posts/', views.profile_posts,
+         name='profile_posts'),
+    path('feed/', views.feed, name='feed'),
+]
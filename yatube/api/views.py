@@ -0,0 +1,259 @@
+from http import HTTPStatus
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.http import JsonResponse
+from django.utils.http import urlencode
+from django.views.decorators.http import condition, require_GET
+
+from posts.conditional import (follow_state, group_state, index_state,
+                               page_condition, profile_state)
+from posts.feed_cache import GROUPS, comments_scope
+from posts.feeds import follow_list, group_list, index_list, profile_list
+from posts.models import Group, Post
+from posts.paginators import CursorPaginator
+from posts.sharding import is_sharded, related, scatter
+
+User = get_user_model()
+
+FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'updated': 'updated',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comments_count': 'comments_count',
+}
+RELATED_FIELDS = {
+    'author': ('author_id', User, 'username'),
+    'group': ('group_id', Group, 'slug'),
+}
+
+
+class ValuesCursorPaginator(CursorPaginator):
+    """Курсорная пагинация строк .values(): значения курсора берутся
+    из словаря, экземпляры моделей не создаются."""
+
+    def cursor_values(self, row):
+        return row['pub_date'].isoformat(), row['id']
+
+
+def sql_integer(value):
+    """int для ключей, которые SQLite хранит в 64-битном INTEGER:
+    большее число запрос не выполнит."""
+    number = int(value)
+    if not -2 ** 63 <= number < 2 ** 63:
+        raise ValueError(f'{value} вне диапазона INTEGER')
+    return number
+
+
+def error_response(message, status):
+    return JsonResponse({'detail': message}, status=status)
+
+
+def requested_fields(request):
+    """Поля из ?fields=id,text; без параметра — все. None — в запросе
+    есть неизвестное поле."""
+    raw = request.GET.get('fields')
+    if not raw:
+        return tuple(FIELDS)
+    fields = tuple(dict.fromkeys(
+        field.strip() for field in raw.split(',') if field.strip()
+    ))
+    if not fields or any(field not in FIELDS for field in fields):
+        return None
+    return fields
+
+
+def field_lookups(fields):
+    """Столбцы .values() для полей ответа. В шардах нет таблиц авторов
+    и групп, поэтому там вместо JOIN читаются внешние ключи."""
+    sharded = is_sharded()
+    return {field: RELATED_FIELDS[field][0]
+            if sharded and field in RELATED_FIELDS else FIELDS[field]
+            for field in fields}
+
+
+def related_values(rows, lookups):
+    """Имена авторов и слаги групп для строк из шардов: по запросу
+    на модель в основной базе."""
+    values = {}
+    for field, lookup in lookups.items():
+        if field not in RELATED_FIELDS or lookup != RELATED_FIELDS[field][0]:
+            continue
+        _, model, name = RELATED_FIELDS[field]
+        ids = {row[lookup] for row in rows} - {None}
+        values[field] = dict(model.objects.filter(pk__in=ids).values_list(
+            'pk', name
+        )) if ids else {}
+    return values
+
+
+def serialize(row, lookups, names):
+    item = {field: row[lookup] for field, lookup in lookups.items()}
+    for field, values in names.items():
+        item[field] = values.get(item[field])
+    if 'image' in item:
+        item['image'] = (default_storage.url(item['image'])
+                         if item['image'] else None)
+    return item
+
+
+def post_item(post):
+    return {
+        'id': post.pk,
+        'text': post.text,
+        'pub_date': post.pub_date,
+        'updated': post.updated,
+        'image': post.image.url if post.image else None,
+        'comments_count': post.comments_count,
+        'author': user_item(post.author),
+        'group': group_item(post.group) if post.group else None,
+    }
+
+
+def user_item(user):
+    return {
+        'username': user.username,
+        'full_name': user.get_full_name(),
+    }
+
+
+def group_item(group):
+    return {
+        'slug': group.slug,
+        'title': group.title,
+        'description': group.description,
+    }
+
+
+def batch_response(request, param, queryset, serialize_item,
+                   field_name='pk', convert=str):
+    """Объекты по списку ключей из ?<param>=a,b,c одним запросом
+    in_bulk. Результаты идут в порядке запроса, ненайденные ключи
+    перечислены в missing."""
+    keys = list(dict.fromkeys(
+        key.strip() for key in request.GET.get(param, '').split(',')
+        if key.strip()
+    ))
+    if not keys:
+        return error_response(f'Передайте параметр {param}.',
+                              HTTPStatus.BAD_REQUEST)
+    if len(keys) > settings.API_BATCH_LIMIT:
+        return error_response(
+            f'Не больше {settings.API_BATCH_LIMIT} ключей за запрос.',
+            HTTPStatus.BAD_REQUEST
+        )
+    try:
+        keys = list(dict.fromkeys(convert(key) for key in keys))
+    except ValueError:
+        return error_response(f'Неверное значение параметра {param}.',
+                              HTTPStatus.BAD_REQUEST)
+    found = queryset.in_bulk(keys, field_name=field_name)
+    return JsonResponse({
+        'results': [serialize_item(found[key]) for key in keys
+                    if key in found],
+        'missing': [key for key in keys if key not in found],
+    })
+
+
+def page_url(request, query):
+    if not query:
+        return None
+    if 'fields' in request.GET:
+        query = urlencode({'fields': request.GET['fields']}) + '&' + query
+    return request.build_absolute_uri(f'{request.path}?{query}')
+
+
+def counted_state(state_func):
+    """Состояние ленты для ETag API. comments_count меняется без смены
+    версий лент, поэтому для ответов с этим полем в состояние входят
+    версии счетчиков комментариев тех же лент."""
+    def state(request, *args, **kwargs):
+        result = state_func(request, *args, **kwargs)
+        fields = requested_fields(request)
+        if result is None or not fields or 'comments_count' not in fields:
+            return result
+        scopes, updated = result
+        return [*scopes, *(comments_scope(scope) for scope in scopes
+                           if scope != GROUPS)], updated
+    return state
+
+
+def posts_response(request, post_list):
+    fields = requested_fields(request)
+    if fields is None:
+        return error_response(
+            'Неизвестное поле. Доступные поля: ' + ', '.join(FIELDS) + '.',
+            HTTPStatus.BAD_REQUEST
+        )
+    lookups = field_lookups(fields)
+    columns = {*lookups.values(), 'id', 'pub_date'}
+    paginator = ValuesCursorPaginator(post_list.values(*columns),
+                                      settings.API_PAGE_SIZE)
+    page = paginator.get_cursor_page(before=request.GET.get('before'),
+                                     after=request.GET.get('after'))
+    rows = list(page.object_list)
+    values = related_values(rows, lookups)
+    return JsonResponse({
+        'results': [serialize(row, lookups, values) for row in rows],
+        'next': page_url(request, page.next_query()),
+        'previous': page_url(request, page.previous_query()),
+    })
+
+
+@require_GET
+@condition(**page_condition(counted_state(index_state)))
+def posts(request):
+    return posts_response(request, index_list())
+
+
+@require_GET
+def posts_batch(request):
+    return batch_response(
+        request, 'ids',
+        scatter(related(Post.objects.all(), 'author', 'group')),
+        post_item, convert=sql_integer
+    )
+
+
+@require_GET
+def users_batch(request):
+    return batch_response(request, 'usernames', User.objects.all(),
+                          user_item, field_name='username')
+
+
+@require_GET
+def groups_batch(request):
+    return batch_response(request, 'slugs', Group.objects.all(),
+                          group_item, field_name='slug')
+
+
+@require_GET
+@condition(**page_condition(counted_state(group_state)))
+def group_posts(request, slug):
+    group = Group.objects.filter(slug=slug).first()
+    if group is None:
+        return error_response('Группа не найдена.', HTTPStatus.NOT_FOUND)
+    return posts_response(request, group_list(group))
+
+
+@require_GET
+@condition(**page_condition(counted_state(profile_state)))
+def profile_posts(request, username):
+    author = User.objects.filter(username=username).first()
+    if author is None:
+        return error_response('Автор не найден.', HTTPStatus.NOT_FOUND)
+    return posts_response(request, profile_list(author))
+
+
+@require_GET
+@condition(**page_condition(counted_state(follow_state)))
+def feed(request):
+    if not request.user.is_authenticated:
+        return error_response('Нужно войти в систему.',
+                              HTTPStatus.UNAUTHORIZED)
+    return posts_response(request, follow_list(request.user))
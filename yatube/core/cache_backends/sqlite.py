@@ -0,0 +1,254 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+
+SCHEMA = (
+    'PRAGMA journal_mode=WAL',
+    'CREATE TABLE IF NOT EXISTS cache ('
+    ' key TEXT PRIMARY KEY,'
+    ' value BLOB NOT NULL,'
+    ' expires REAL,'
+    ' accessed REAL NOT NULL,'
+    ' size INTEGER NOT NULL'
+    ') WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+    'CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)',
+    'CREATE TABLE IF NOT EXISTS cache_stats ('
+    ' id INTEGER PRIMARY KEY CHECK (id = 0),'
+    ' count INTEGER NOT NULL,'
+    ' size INTEGER NOT NULL'
+    ')',
+    'INSERT OR IGNORE INTO cache_stats VALUES (0, 0, 0)',
+    'CREATE TRIGGER IF NOT EXISTS cache_insert AFTER INSERT ON cache BEGIN'
+    ' UPDATE cache_stats SET count = count + 1, size = size + NEW.size'
+    ' WHERE id = 0; END',
+    'CREATE TRIGGER IF NOT EXISTS cache_delete AFTER DELETE ON cache BEGIN'
+    ' UPDATE cache_stats SET count = count - 1, size = size - OLD.size'
+    ' WHERE id = 0; END',
+    'CREATE TRIGGER IF NOT EXISTS cache_update AFTER UPDATE OF size'
+    ' ON cache BEGIN'
+    ' UPDATE cache_stats SET size = size - OLD.size + NEW.size'
+    ' WHERE id = 0; END',
+)
+
+FETCH_CHUNK = 500
+
+UPSERT = (
+    'INSERT INTO cache (key, value, expires, accessed, size)'
+    ' VALUES (?, ?, ?, ?, ?)'
+    ' ON CONFLICT (key) DO UPDATE SET value = excluded.value,'
+    ' expires = excluded.expires, accessed = excluded.accessed,'
+    ' size = excluded.size'
+)
+
+
+class SQLiteCache(BaseCache):
+    """Кэш в файле SQLite (WAL), общий для всех процессов на хосте.
+
+    Вытеснение — LRU по времени последнего чтения, с ограничением
+    по числу записей (MAX_ENTRIES) и суммарному размеру (MAX_SIZE).
+    """
+
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._max_size = int(options.get('MAX_SIZE', 64 * 1024 * 1024))
+        self._busy_timeout = float(options.get('BUSY_TIMEOUT', 5))
+        self._access_resolution = float(
+            options.get('ACCESS_RESOLUTION', 1)
+        )
+        self._local = threading.local()
+
+    @property
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self._path,
+                                         timeout=self._busy_timeout,
+                                         isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute('PRAGMA synchronous=NORMAL')
+            for statement in SCHEMA:
+                connection.execute(statement)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _row(self, key, value, timeout, now):
+        data = pickle.dumps(value, self.pickle_protocol)
+        return key, data, self.get_backend_timeout(timeout), now, len(data)
+
+    @contextmanager
+    def _transaction(self):
+        connection = self._connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def _write(self, rows):
+        with self._transaction() as connection:
+            connection.executemany(UPSERT, rows)
+            self._cull(connection)
+
+    def _cull(self, connection):
+        count, size = connection.execute(
+            'SELECT count, size FROM cache_stats WHERE id = 0'
+        ).fetchone()
+        if count <= self._max_entries and size <= self._max_size:
+            return
+        connection.execute('DELETE FROM cache WHERE expires < ?',
+                           (time.time(),))
+        if self._cull_frequency == 0:
+            connection.execute('DELETE FROM cache')
+            return
+        count, size = connection.execute(
+            'SELECT count, size FROM cache_stats WHERE id = 0'
+        ).fetchone()
+        while count > self._max_entries or size > self._max_size:
+            connection.execute(
+                'DELETE FROM cache WHERE key IN'
+                ' (SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+                (max(count // self._cull_frequency, 1),)
+            )
+            count, size = connection.execute(
+                'SELECT count, size FROM cache_stats WHERE id = 0'
+            ).fetchone()
+
+    def _fetch(self, keys):
+        now = time.time()
+        rows = []
+        for start in range(0, len(keys), FETCH_CHUNK):
+            chunk = keys[start:start + FETCH_CHUNK]
+            placeholders = ', '.join('?' * len(chunk))
+            rows += self._connection.execute(
+                'SELECT key, value, expires, accessed FROM cache'
+                f' WHERE key IN ({placeholders})',
+                chunk
+            ).fetchall()
+        found, touched, expired = {}, [], []
+        for key, value, expires, accessed in rows:
+            if expires is not None and expires < now:
+                expired.append((key, now))
+                continue
+            found[key] = pickle.loads(value)
+            if now - accessed > self._access_resolution:
+                touched.append((now, key))
+        if touched or expired:
+            with self._transaction() as connection:
+                connection.executemany(
+                    'UPDATE cache SET accessed = ? WHERE key = ?', touched
+                )
+                connection.executemany(
+                    'DELETE FROM cache WHERE key = ? AND expires < ?',
+                    expired
+                )
+        return found
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        return self._fetch([key]).get(key, default)
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        made = {self._key(key, version): key for key in keys}
+        found = self._fetch(list(made))
+        return {made[key]: value for key, value in found.items()}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        self._write([self._row(key, value, timeout, time.time())])
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        self._write([
+            self._row(self._key(key, version), value, timeout, now)
+            for key, value in data.items()
+        ])
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._transaction() as connection:
+            connection.execute(
+                'DELETE FROM cache WHERE key = ? AND expires < ?', (key, now)
+            )
+            added = connection.execute(
+                'INSERT OR IGNORE INTO cache'
+                ' (key, value, expires, accessed, size)'
+                ' VALUES (?, ?, ?, ?, ?)',
+                self._row(key, value, timeout, now)
+            ).rowcount == 1
+            if added:
+                self._cull(connection)
+        return added
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        with self._transaction() as connection:
+            row = connection.execute(
+                'SELECT value, expires FROM cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None or (row[1] is not None and row[1] < time.time()):
+                raise ValueError("Key '%s' not found" % key)
+            value = pickle.loads(row[0]) + delta
+            data = pickle.dumps(value, self.pickle_protocol)
+            connection.execute(
+                'UPDATE cache SET value = ?, size = ? WHERE key = ?',
+                (data, len(data), key)
+            )
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        return self._connection.execute(
+            'UPDATE cache SET expires = ? WHERE key = ?'
+            ' AND (expires IS NULL OR expires >= ?)',
+            (self.get_backend_timeout(timeout), key, time.time())
+        ).rowcount == 1
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return self._connection.execute(
+            'SELECT 1 FROM cache WHERE key = ?'
+            ' AND (expires IS NULL OR expires >= ?)',
+            (key, time.time())
+        ).fetchone() is not None
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        self._connection.execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def delete_many(self, keys, version=None):
+        self._connection.executemany(
+            'DELETE FROM cache WHERE key = ?',
+            [(self._key(key, version),) for key in keys]
+        )
+
+    def clear(self):
+        self._connection.execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        pass
@@ -0,0 +1,91 @@
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+from core.bench import summarize
+
+
+def build_cache(config):
+    backend = import_string(config['BACKEND'])
+    return backend(config.get('LOCATION', ''), config)
+
+
+def run_worker(args):
+    config, worker, options = args
+    cache = build_cache(config)
+    rng = random.Random(options['seed'] + worker)
+    keys = [f'bench:page:{i}' for i in range(options['keys'])]
+    weights = [1 / (rank + 1) for rank in range(options['keys'])]
+    payload = 'x' * options['payload']
+    render = options['render_ms'] / 1000
+    hits, get_latency, request_latency = 0, [], []
+    for _ in range(options['requests']):
+        key = rng.choices(keys, weights)[0]
+        started = time.perf_counter()
+        value = cache.get(key)
+        get_latency.append(time.perf_counter() - started)
+        if value is None:
+            time.sleep(render)
+            cache.set(key, payload, options['timeout'])
+        else:
+            hits += 1
+        request_latency.append(time.perf_counter() - started)
+    return hits, get_latency, request_latency
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает долю попаданий и задержки кэша страниц '
+            'для нескольких процессов-воркеров.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--keys', type=int, default=200)
+        parser.add_argument('--payload', type=int, default=20000)
+        parser.add_argument('--render-ms', type=float, default=5)
+        parser.add_argument('--timeout', type=int, default=60)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--location', default=None)
+
+    def handle(self, *args, **options):
+        location = options['location'] or os.path.join(
+            tempfile.mkdtemp(), 'bench_cache.sqlite3'
+        )
+        backends = {
+            'locmem': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'bench',
+            },
+            'sqlite': dict(settings.CACHE_BACKENDS['sqlite'],
+                           LOCATION=location),
+        }
+        self.stdout.write(
+            f'{"backend":<8} {"hit rate":>9} {"get p50":>9} '
+            f'{"get p99":>9} {"req p50":>9} {"req p95":>9} {"total s":>8}'
+        )
+        for name, config in backends.items():
+            build_cache(config).clear()
+            jobs = [(config, worker, options)
+                    for worker in range(options['workers'])]
+            started = time.perf_counter()
+            with multiprocessing.Pool(options['workers']) as pool:
+                results = pool.map(run_worker, jobs)
+            total = time.perf_counter() - started
+            hits = sum(result[0] for result in results)
+            gets = summarize([t for result in results for t in result[1]])
+            requests = summarize(
+                [t for result in results for t in result[2]]
+            )
+            rate = hits / (options['workers'] * options['requests'])
+            self.stdout.write(
+                f'{name:<8} {rate:>9.1%} {gets["p50"] * 1000:>7.3f}ms '
+                f'{gets["p99"] * 1000:>7.3f}ms '
+                f'{requests["p50"] * 1000:>7.3f}ms '
+                f'{requests["p95"] * 1000:>7.3f}ms {total:>8.2f}'
+            )
@@ -0,0 +1,113 @@
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.bench import summarize
+from core.signals import pragma_statements
+
+SCHEMA = (
+    'CREATE TABLE comment ('
+    ' id INTEGER PRIMARY KEY,'
+    ' post_id INTEGER NOT NULL,'
+    ' pub_date REAL NOT NULL,'
+    ' text TEXT NOT NULL'
+    ')',
+    'CREATE INDEX comment_post_pub_date ON comment (post_id, pub_date, id)',
+)
+READ = ('SELECT id, pub_date, text FROM comment WHERE post_id = ? '
+        'ORDER BY pub_date, id LIMIT 20')
+WRITE = 'INSERT INTO comment (post_id, pub_date, text) VALUES (?, ?, ?)'
+BASELINE_PRAGMAS = {'journal_mode': 'DELETE'}
+
+
+def connect(path, pragmas):
+    connection = sqlite3.connect(path)
+    for statement in pragma_statements(pragmas):
+        connection.execute(statement)
+    return connection
+
+
+def create_database(path, pragmas, options):
+    connection = connect(path, pragmas)
+    for statement in SCHEMA:
+        connection.execute(statement)
+    rng = random.Random(options['seed'])
+    with connection:
+        connection.executemany(WRITE, (
+            (rng.randrange(options['posts']), time.time(), 'x' * 200)
+            for _ in range(options['rows'])
+        ))
+    connection.close()
+
+
+def run_worker(args):
+    path, pragmas, worker, options = args
+    connection = connect(path, pragmas)
+    rng = random.Random(options['seed'] + worker)
+    reads, writes, errors = [], [], 0
+    deadline = time.perf_counter() + options['duration']
+    while time.perf_counter() < deadline:
+        post_id = rng.randrange(options['posts'])
+        started = time.perf_counter()
+        try:
+            if rng.random() < options['write_ratio']:
+                with connection:
+                    connection.execute(WRITE,
+                                       (post_id, time.time(), 'x' * 200))
+                writes.append(time.perf_counter() - started)
+            else:
+                connection.execute(READ, (post_id,)).fetchall()
+                reads.append(time.perf_counter() - started)
+        except sqlite3.OperationalError:
+            errors += 1
+    connection.close()
+    return reads, writes, errors
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает пропускную способность SQLite под смешанной '
+            'нагрузкой чтения и записи из нескольких процессов: '
+            'без настроек и с SQLITE_PRAGMAS.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--duration', type=float, default=5)
+        parser.add_argument('--write-ratio', type=float, default=0.2)
+        parser.add_argument('--rows', type=int, default=50000)
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        directory = tempfile.mkdtemp()
+        modes = {
+            'baseline': BASELINE_PRAGMAS,
+            'tuned': settings.SQLITE_PRAGMAS,
+        }
+        self.stdout.write(
+            f'{"mode":<9} {"ops/s":>8} {"reads/s":>8} {"writes/s":>9} '
+            f'{"read p95":>9} {"write p95":>10} {"errors":>7}'
+        )
+        for name, pragmas in modes.items():
+            path = os.path.join(directory, f'{name}.sqlite3')
+            create_database(path, pragmas, options)
+            jobs = [(path, pragmas, worker, options)
+                    for worker in range(options['workers'])]
+            started = time.perf_counter()
+            with multiprocessing.Pool(options['workers']) as pool:
+                results = pool.map(run_worker, jobs)
+            total = time.perf_counter() - started
+            reads = [t for result in results for t in result[0]]
+            writes = [t for result in results for t in result[1]]
+            errors = sum(result[2] for result in results)
+            self.stdout.write(
+                f'{name:<9} {(len(reads) + len(writes)) / total:>8.0f} '
+                f'{len(reads) / total:>8.0f} {len(writes) / total:>9.0f} '
+                f'{summarize(reads)["p95"] * 1000:>7.2f}ms '
+                f'{summarize(writes)["p95"] * 1000:>8.2f}ms {errors:>7}'
+            )
@@ -0,0 +1,22 @@
+from django.conf import settings
+
+from .routers import SAFE_METHODS
+
+
+class PrimaryStickinessMiddleware:
+    """После записи ставит куку, и REPLICA_STICKY_SECONDS секунд чтения
+    клиента идут в основную базу: редирект после POST покажет новые
+    данные, даже если реплика отстает."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (settings.READ_REPLICA_ALIAS
+                and request.method not in SAFE_METHODS
+                and response.status_code < 400):
+            response.set_cookie(settings.REPLICA_STICKY_COOKIE, '1',
+                                max_age=settings.REPLICA_STICKY_SECONDS,
+                                httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,46 @@
+import functools
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+_state = threading.local()
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+def is_pinned(request):
+    return settings.REPLICA_STICKY_COOKIE in request.COOKIES
+
+
+def replica_reads(view):
+    """Чтения внутри представления идут в реплику, если она настроена
+    и клиент недавно ничего не записывал."""
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in SAFE_METHODS or is_pinned(request):
+            return view(request, *args, **kwargs)
+        previous = getattr(_state, 'use_replica', False)
+        _state.use_replica = True
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _state.use_replica = previous
+    return wrapper
+
+
+class ReplicaRouter:
+    """Запись — всегда в основную базу, чтение в представлениях
+    с replica_reads — в READ_REPLICA_ALIAS."""
+
+    def db_for_read(self, model, **hints):
+        if settings.READ_REPLICA_ALIAS and getattr(_state, 'use_replica',
+                                                   False):
+            return settings.READ_REPLICA_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
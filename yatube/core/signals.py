@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+def pragma_statements(pragmas):
+    return [f'PRAGMA {name} = {value}' for name, value in pragmas.items()]
+
+
+@receiver(connection_created)
+def sqlite_apply_pragmas(sender, connection, **kwargs):
+    """Настраивает каждое новое соединение с SQLite по SQLITE_PRAGMAS:
+    WAL, чтобы читатели не ждали писателей, и ожидание блокировки
+    вместо ошибки database is locked."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for statement in pragma_statements(settings.SQLITE_PRAGMAS):
+            cursor.execute(statement)
@@ -0,0 +1,97 @@
+import functools
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+
+def start_refresh(refresh):
+    """Запускает refresh в фоновом потоке и закрывает открытые им
+    соединения с базой."""
+    def run():
+        try:
+            refresh()
+        finally:
+            connections.close_all()
+    threading.Thread(target=run, daemon=True).start()
+
+
+def is_fresh(entry):
+    return entry is not None and time.time() < entry['fresh_until']
+
+
+def wait_for_lock(key, lock_key, entry, lock_timeout, wait):
+    """Берет блокировку ключа. Если она занята, возвращает имеющееся
+    (возможно устаревшее) значение, а без него ждет, пока вычисляющий
+    запрос не сохранит результат или не отпустит блокировку."""
+    deadline = time.time() + wait
+    while not cache.add(lock_key, 1, lock_timeout):
+        if entry is not None or time.time() >= deadline:
+            return False, entry
+        time.sleep(settings.SINGLE_FLIGHT_POLL_INTERVAL)
+        entry = cache.get(key)
+    return True, entry
+
+
+def get_or_compute(key, compute, timeout, stale_timeout=None,
+                   lock_timeout=None, wait=None):
+    """Значение по ключу из кэша или результат compute().
+
+    На промахе вычисляет только запрос, взявший блокировку cache.add.
+    Остальные отдают устаревшее значение, если оно есть, или ждут
+    результат не дольше wait секунд, после чего считают сами.
+    """
+    entry = cache.get(key)
+    if is_fresh(entry):
+        return entry['value']
+    lock_key = f'{key}:lock'
+    locked, entry = wait_for_lock(
+        key, lock_key, entry,
+        settings.SINGLE_FLIGHT_LOCK_TIMEOUT if lock_timeout is None
+        else lock_timeout,
+        settings.SINGLE_FLIGHT_WAIT if wait is None else wait
+    )
+    if not locked:
+        return entry['value'] if entry is not None else compute()
+    try:
+        entry = cache.get(key)
+        if is_fresh(entry):
+            return entry['value']
+        value = compute()
+        if stale_timeout is None:
+            stale_timeout = settings.SINGLE_FLIGHT_STALE_TIMEOUT
+        cache.set(key, {'value': value,
+                        'fresh_until': time.time() + timeout},
+                  timeout + stale_timeout)
+        return value
+    finally:
+        cache.delete(lock_key)
+
+
+def single_flight(key_func, timeout=None, dump=None, load=None, **options):
+    """Декоратор для get_or_compute. key_func получает аргументы
+    функции и возвращает ключ или None (тогда кэш не используется).
+    dump и load переводят результат в форму для кэша и обратно;
+    load получает также аргументы вызова."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = key_func(*args, **kwargs)
+            if key is None:
+                return func(*args, **kwargs)
+
+            def compute():
+                value = func(*args, **kwargs)
+                return dump(value) if dump else value
+
+            value = get_or_compute(
+                key, compute,
+                settings.SINGLE_FLIGHT_TIMEOUT if timeout is None
+                else timeout,
+                **options
+            )
+            return load(value, *args, **kwargs) if load else value
+        return wrapper
+    return decorator
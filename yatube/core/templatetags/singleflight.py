@@ -0,0 +1,53 @@
+from django import template
+from django.core.cache.utils import make_template_fragment_key
+
+from ..singleflight import get_or_compute
+
+register = template.Library()
+
+
+class SingleFlightNode(template.Node):
+    def __init__(self, nodelist, timeout, fragment_name, vary_on):
+        self.nodelist = nodelist
+        self.timeout = timeout
+        self.fragment_name = fragment_name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        timeout = self.timeout.resolve(context)
+        try:
+            timeout = int(timeout)
+        except (ValueError, TypeError):
+            raise template.TemplateSyntaxError(
+                f'"singleflight" got a non-integer timeout: {timeout!r}'
+            )
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        key = 'single_flight.' + make_template_fragment_key(
+            self.fragment_name, vary_on
+        )
+        return get_or_compute(key, lambda: self.nodelist.render(context),
+                              timeout)
+
+
+@register.tag
+def singleflight(parser, token):
+    """Как {% cache %}, но при промахе фрагмент рендерит один запрос,
+    а остальные ждут его результат:
+
+        {% singleflight timeout fragment_name var1 var2 %}
+          ...
+        {% endsingleflight %}
+    """
+    nodelist = parser.parse(('endsingleflight',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 3:
+        raise template.TemplateSyntaxError(
+            f'"{tokens[0]}" tag requires at least 2 arguments.'
+        )
+    return SingleFlightNode(
+        nodelist,
+        parser.compile_filter(tokens[1]),
+        tokens[2],
+        [parser.compile_filter(token) for token in tokens[3:]],
+    )
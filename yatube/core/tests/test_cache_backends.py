@@ -0,0 +1,73 @@
+import os
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase
+
+from ..cache_backends.sqlite import SQLiteCache
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = self.create_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def create_cache(self, **options):
+        return SQLiteCache(self.location, {'OPTIONS': options})
+
+    def test_shared_between_instances(self):
+        """Проверяем, что значения видны другим экземплярам кэша,
+        открытым на тот же файл (как в других процессах)."""
+
+        self.cache.set('page', 'html')
+        other = self.create_cache()
+        self.assertEqual(other.get('page'), 'html')
+        other.delete('page')
+        self.assertIsNone(self.cache.get('page'))
+
+    def test_basic_operations(self):
+        """Проверяем add, incr, get_many, touch и истечение срока."""
+
+        self.assertTrue(self.cache.add('counter', 1))
+        self.assertFalse(self.cache.add('counter', 5))
+        self.assertEqual(self.cache.incr('counter', 2), 3)
+        self.cache.set_many({'a': 1, 'b': 2})
+        self.assertEqual(self.cache.get_many(['a', 'b', 'c']),
+                         {'a': 1, 'b': 2})
+        self.cache.set('expired', 1, timeout=0)
+        self.assertIsNone(self.cache.get('expired'))
+        self.assertFalse(self.cache.touch('expired'))
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_lru_eviction_by_entries(self):
+        """Проверяем, что при переполнении вытесняются давно
+        не читавшиеся записи."""
+
+        cache = self.create_cache(MAX_ENTRIES=10, CULL_FREQUENCY=2,
+                                  ACCESS_RESOLUTION=0)
+        for i in range(10):
+            cache.set(f'key_{i}', i)
+        self.assertEqual(cache.get('key_0'), 0)
+        for i in range(10, 15):
+            cache.set(f'key_{i}', i)
+        self.assertEqual(cache.get('key_0'), 0,
+                         'Недавно прочитанная запись должна остаться')
+        self.assertIsNone(cache.get('key_1'),
+                          'Давно не читавшаяся запись должна быть вытеснена')
+
+    def test_size_cap(self):
+        """Проверяем, что суммарный размер значений ограничен MAX_SIZE."""
+
+        cache = self.create_cache(MAX_SIZE=10000)
+        for i in range(20):
+            cache.set(f'key_{i}', 'x' * 1000)
+        count, size = cache._connection.execute(
+            'SELECT COUNT(*), SUM(size) FROM cache'
+        ).fetchone()
+        self.assertLessEqual(size, 10000)
+        self.assertLess(count, 20)
@@ -0,0 +1,124 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connections
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import feed_cache
+from posts.models import Post
+
+User = get_user_model()
+
+REPLICA = 'replica'
+
+
+@override_settings(READ_REPLICA_ALIAS=REPLICA, CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    }
+})
+class ReplicaRouterTests(TestCase):
+    databases = {'default', REPLICA}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        connections.databases[REPLICA] = dict(
+            connections.databases['default'],
+            NAME=os.path.join(cls.directory, 'replica.sqlite3')
+        )
+        call_command('migrate', database=REPLICA, verbosity=0)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.databases[REPLICA]
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='test')
+        replica_user = User.objects.db_manager(REPLICA).create_user(
+            pk=cls.user.pk, username='test'
+        )
+        Post.objects.create(author=cls.user, text='Пост в основной базе')
+        Post.objects.using(REPLICA).bulk_create(
+            [Post(author=replica_user, text='Пост из реплики')]
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(ReplicaRouterTests.user)
+
+    def test_reads_from_replica(self):
+        """Проверяем, что страницы ленты читают посты из реплики."""
+
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Пост из реплики')
+        self.assertNotContains(response, 'Пост в основной базе')
+
+    def test_write_pins_reads_to_primary(self):
+        """Проверяем, что запись идет в основную базу, а после нее
+        клиент читает из основной базы, пока действует кука."""
+
+        response = self.client.post(reverse('posts:post_create'),
+                                    data={'text': 'Новый пост'},
+                                    follow=True)
+        self.assertIn(settings.REPLICA_STICKY_COOKIE, self.client.cookies)
+        self.assertContains(response, 'Новый пост')
+        self.assertTrue(Post.objects.filter(text='Новый пост').exists())
+        self.assertFalse(
+            Post.objects.using(REPLICA).filter(text='Новый пост').exists()
+        )
+        other_client = Client()
+        other_client.force_login(ReplicaRouterTests.user)
+        self.assertNotContains(
+            other_client.get(reverse('posts:profile',
+                                     kwargs={'username': 'test'})),
+            'Новый пост'
+        )
+
+    @override_settings(CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'replica-tests',
+        }
+    })
+    @mock.patch.object(feed_cache, '_timer', None)
+    @mock.patch.dict(feed_cache._rebumps, clear=True)
+    def test_stale_replica_pages_expire_after_lag(self):
+        """Проверяем, что страница, закэшированная с отстающей реплики
+        под новой версией ленты, сменяется после повторной смены версий
+        через REPLICA_STICKY_SECONDS."""
+
+        guest_client = Client()
+        guest_client.get(reverse('posts:index'))
+        with mock.patch('posts.feed_cache.threading.Timer') as timer:
+            Post.objects.create(author=ReplicaRouterTests.user,
+                                text='Пост до реплики')
+        timer.assert_called_once()
+        self.assertEqual(timer.call_args[0][1], feed_cache.run_rebumps)
+        self.assertNotContains(guest_client.get(reverse('posts:index')),
+                               'Пост до реплики')
+        Post.objects.using(REPLICA).bulk_create([Post(
+            author=User.objects.using(REPLICA).get(username='test'),
+            text='Пост до реплики'
+        )])
+        self.assertNotContains(guest_client.get(reverse('posts:index')),
+                               'Пост до реплики')
+        due = feed_cache.time.monotonic() + settings.REPLICA_STICKY_SECONDS
+        with mock.patch('posts.feed_cache.time.monotonic',
+                        return_value=due):
+            feed_cache.run_rebumps()
+        self.assertEqual(feed_cache._rebumps, {})
+        self.assertContains(guest_client.get(reverse('posts:index')),
+                            'Пост до реплики')
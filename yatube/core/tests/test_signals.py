@@ -0,0 +1,47 @@
+import os
+import shutil
+import tempfile
+
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase, override_settings
+
+
+class SQLitePragmasTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    @override_settings(SQLITE_PRAGMAS={
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 1234,
+        'mmap_size': 1024 * 1024,
+        'cache_size': -2048,
+        'temp_store': 'MEMORY',
+    })
+    def test_new_connection_configured(self):
+        """Проверяем, что новое соединение с SQLite получает прагмы
+        из настроек."""
+
+        wrapper = DatabaseWrapper(
+            dict(connection.settings_dict,
+                 NAME=os.path.join(self.directory, 'db.sqlite3')),
+            alias='pragmas'
+        )
+        try:
+            self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+            self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)
+            self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 1234)
+            self.assertEqual(self.pragma(wrapper, 'mmap_size'), 1024 * 1024)
+            self.assertEqual(self.pragma(wrapper, 'cache_size'), -2048)
+            self.assertEqual(self.pragma(wrapper, 'temp_store'), 2)
+        finally:
+            wrapper.close()
@@ -0,0 +1,96 @@
+import threading
+import time
+from collections import Counter
+
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+
+from ..singleflight import get_or_compute, single_flight
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'single_flight',
+    }
+}, SINGLE_FLIGHT_WAIT=5)
+class SingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = Counter()
+        self.lock = threading.Lock()
+
+    def slow_compute(self, key):
+        def compute():
+            with self.lock:
+                self.calls[key] += 1
+            time.sleep(0.05)
+            return f'value:{key}'
+        return compute
+
+    def test_one_recompute_per_key(self):
+        """Проверяем, что при одновременном промахе многих потоков
+        значение каждого ключа вычисляется один раз."""
+
+        keys = ['index:1', 'index:2', 'group:1']
+        results = []
+        barrier = threading.Barrier(len(keys) * 10)
+
+        def worker(key):
+            barrier.wait()
+            results.append(
+                (key, get_or_compute(key, self.slow_compute(key), 60))
+            )
+
+        threads = [threading.Thread(target=worker, args=(key,))
+                   for key in keys for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.calls, Counter({key: 1 for key in keys}))
+        self.assertEqual(len(results), len(threads))
+        for key, value in results:
+            self.assertEqual(value, f'value:{key}')
+
+    def test_stale_value_served_during_recompute(self):
+        """Проверяем, что пока один запрос пересчитывает значение,
+        остальные сразу получают устаревшее."""
+
+        cache.set('page', {'value': 'old', 'fresh_until': time.time() - 1},
+                  60)
+        cache.add('page:lock', 1, 60)
+        compute = self.slow_compute('page')
+        self.assertEqual(get_or_compute('page', compute, 60), 'old')
+        self.assertFalse(self.calls, 'Устаревшее значение не пересчитывается')
+
+    @override_settings(SINGLE_FLIGHT_WAIT=0.05)
+    def test_wait_timeout_computes(self):
+        """Проверяем, что после истечения ожидания запрос считает сам."""
+
+        cache.add('page:lock', 1, 60)
+        compute = self.slow_compute('page')
+        self.assertEqual(get_or_compute('page', compute, 60), 'value:page')
+        self.assertEqual(self.calls['page'], 1)
+
+    def test_decorator_and_template_tag(self):
+        """Проверяем декоратор с dump/load и тег singleflight."""
+
+        @single_flight(lambda number: f'square:{number}', timeout=60,
+                       dump=str, load=lambda value, number: int(value))
+        def square(number):
+            self.calls['square'] += 1
+            return number * number
+
+        self.assertEqual([square(3), square(3)], [9, 9])
+        self.assertEqual(self.calls['square'], 1)
+        template = Template(
+            '{% load singleflight %}'
+            '{% singleflight 60 fragment name %}{{ value }}'
+            '{% endsingleflight %}'
+        )
+        first = template.render(Context({'name': 'a', 'value': 'первый'}))
+        second = template.render(Context({'name': 'a', 'value': 'второй'}))
+        self.assertEqual(first, 'первый')
+        self.assertEqual(second, 'первый')
@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from .feed_cache import (card_group_scope, card_post_scope, card_user_scope,
+                         get_feed_versions)
+from .thumbnails import prefetch_thumbnails
+
+CARD_TEMPLATE = 'posts/post.html'
+
+
+def card_scopes(post):
+    scopes = [card_post_scope(post.pk), card_user_scope(post.author_id)]
+    if post.group_id:
+        scopes.append(card_group_scope(post.group_id))
+    return scopes
+
+
+def card_keys(posts, options):
+    """Ключи карточек: пост, флаги шаблона и версии поста, автора и
+    группы. Версии всех карточек читаются одним get_many."""
+    scopes = {post.pk: card_scopes(post) for post in posts}
+    unique = list(dict.fromkeys(
+        scope for post_scopes in scopes.values() for scope in post_scopes
+    ))
+    versions = dict(zip(unique, get_feed_versions(*unique)))
+    flags = ''.join(str(int(bool(value)))
+                    for _, value in sorted(options.items()))
+    return {
+        post.pk: f'post_card:{post.pk}:{flags}:' + '.'.join(
+            str(versions[scope]) for scope in scopes[post.pk]
+        )
+        for post in posts
+    }
+
+
+def render_cards(posts, **options):
+    """Отрисованные карточки постов в исходном порядке. Кэш читается
+    одним get_many, шаблон рендерится только для промахов."""
+    posts = list(posts)
+    if not posts:
+        return []
+    keys = card_keys(posts, options)
+    cards = cache.get_many(list(keys.values()))
+    missing = [post for post in posts if keys[post.pk] not in cards]
+    if missing:
+        prefetch_thumbnails(missing)
+        rendered = {
+            keys[post.pk]: render_to_string(
+                CARD_TEMPLATE, dict(options, post=post)
+            )
+            for post in missing
+        }
+        cache.set_many(rendered, settings.CARD_CACHE_TIMEOUT)
+        cards.update(rendered)
+    return [cards[keys[post.pk]] for post in posts]
@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.core.checks import Error, Warning, register
+from django.utils.module_loading import import_string
+
+from .search import SQLiteSearchBackend
+from .thumbnails import shared_cache
+
+
+@register()
+def sharding_check(app_configs, **kwargs):
+    """Лента подписок через TimelineEntry и индекс FTS5 ссылаются на посты
+    в основной базе, поэтому с POST_SHARDS они не работают."""
+    if not settings.POST_SHARDS:
+        return []
+    errors = [
+        Error(f'Шард {alias} не описан в DATABASES.', id='posts.E001')
+        for alias in settings.POST_SHARDS if alias not in settings.DATABASES
+    ]
+    if len(settings.POST_SHARDS) > settings.POST_SHARD_ID_STRIDE:
+        errors.append(Error(
+            'Шардов больше, чем POST_SHARD_ID_STRIDE: их id пересекутся.',
+            id='posts.E004'
+        ))
+    if settings.TIMELINE_ENABLED:
+        errors.append(Error('POST_SHARDS несовместим с TIMELINE_ENABLED.',
+                            id='posts.E002'))
+    if issubclass(import_string(settings.SEARCH_BACKEND),
+                  SQLiteSearchBackend):
+        errors.append(Error(
+            'POST_SHARDS несовместим с SQLiteSearchBackend.',
+            hint='Используйте posts.search.LikeSearchBackend.',
+            id='posts.E003'
+        ))
+    return errors
+
+
+@register()
+def thumbnails_check(app_configs, **kwargs):
+    """Воркер миниатюр пишет миниатюру и версии лент в кэш, который
+    должен видеть веб-процесс."""
+    if not settings.THUMBNAIL_WORKERS or shared_cache():
+        return []
+    return [Warning(
+        'THUMBNAIL_WORKERS не действует с кэшем в памяти процесса: '
+        'миниатюры создаются в процессе запроса.',
+        hint="Задайте общий кэш, например CACHE_BACKEND = 'sqlite'.",
+        id='posts.W001'
+    )]
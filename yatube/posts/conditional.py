@@ -0,0 +1,104 @@
+import hashlib
+from datetime import datetime, timezone
+
+from django.contrib.auth import get_user_model
+
+from .feed_cache import (INDEX, GROUPS, get_feed_versions, group_scope,
+                         post_scope, profile_scope)
+from .models import Follow, Group
+from .sharding import post_queryset
+
+User = get_user_model()
+
+
+def index_state(request):
+    return [INDEX], None
+
+
+def group_state(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True
+    ).first()
+    if group_id is None:
+        return None
+    return [group_scope(group_id)], None
+
+
+def profile_state(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True
+    ).first()
+    if author_id is None:
+        return None
+    return [profile_scope(author_id), GROUPS], None
+
+
+def follow_state(request):
+    if not request.user.is_authenticated:
+        return None
+    author_ids = Follow.objects.filter(user=request.user).values_list(
+        'author_id', flat=True
+    )
+    return [profile_scope(request.user.pk), GROUPS,
+            *(profile_scope(author_id) for author_id in author_ids)], None
+
+
+def post_state(request, post_id):
+    row = post_queryset(post_id).filter(pk=post_id).values_list(
+        'author_id', 'updated'
+    ).first()
+    if row is None:
+        return None
+    author_id, updated = row
+    return [post_scope(post_id), profile_scope(author_id), GROUPS], updated
+
+
+def page_state(request, state_func, *args, **kwargs):
+    """Версии областей страницы и время изменения объекта, вычисленные
+    один раз на запрос. None — объекта нет, страница ответит 404."""
+    if not hasattr(request, '_page_state'):
+        state = state_func(request, *args, **kwargs)
+        if state is not None:
+            scopes, updated = state
+            state = get_feed_versions(*scopes), updated
+        request._page_state = state
+    return request._page_state
+
+
+def page_etag(state_func):
+    def etag(request, *args, **kwargs):
+        state = page_state(request, state_func, *args, **kwargs)
+        if state is None:
+            return None
+        versions, updated = state
+        raw = '|'.join([
+            str(request.user.pk) if request.user.is_authenticated
+            else 'anon',
+            request.get_full_path(),
+            '.'.join(str(version) for version in versions),
+            updated.isoformat() if updated else '',
+        ])
+        return hashlib.md5(raw.encode()).hexdigest()
+    return etag
+
+
+def page_last_modified(state_func):
+    """Last-Modified только для анонимов: у вошедших пользователей
+    страница зависит от пользователя, а дата этого не учитывает.
+    Версии — метки времени в микросекундах."""
+    def last_modified(request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return None
+        state = page_state(request, state_func, *args, **kwargs)
+        if state is None:
+            return None
+        versions, updated = state
+        modified = datetime.fromtimestamp(max(versions) / 1000000,
+                                          timezone.utc)
+        return max(modified, updated) if updated else modified
+    return last_modified
+
+
+def page_condition(state_func):
+    return {'etag_func': page_etag(state_func),
+            'last_modified_func': page_last_modified(state_func)}
@@ -0,0 +1,111 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+INDEX = 'index'
+GROUPS = 'groups'
+
+_lock = threading.Lock()
+_rebumps = {}
+_timer = None
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def profile_scope(author_id):
+    return f'profile:{author_id}'
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def comments_scope(scope):
+    return f'comments:{scope}'
+
+
+def card_post_scope(post_id):
+    return f'card_post:{post_id}'
+
+
+def card_group_scope(group_id):
+    return f'card_group:{group_id}'
+
+
+def card_user_scope(user_id):
+    return f'card_user:{user_id}'
+
+
+def version_key(scope):
+    return f'feed_version:{scope}'
+
+
+def new_version():
+    return int(time.time() * 1000000)
+
+
+def get_feed_versions(*scopes):
+    keys = [version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            version = new_version()
+            if not cache.add(key, version, None):
+                version = cache.get(key, version)
+            versions[key] = version
+    return [versions[key] for key in keys]
+
+
+def feed_version(*scopes):
+    return '.'.join(str(version) for version in get_feed_versions(*scopes))
+
+
+def set_feed_versions(scopes):
+    version = new_version()
+    cache.set_many({version_key(scope): version for scope in scopes}, None)
+
+
+def bump_feed_versions(*scopes):
+    """Новые версии областей. С репликой области меняются еще раз
+    через REPLICA_STICKY_SECONDS: пока реплика отстает, читатель
+    с нее мог закэшировать под новой версией старые строки."""
+    set_feed_versions(scopes)
+    if settings.READ_REPLICA_ALIAS:
+        schedule_rebump(scopes)
+
+
+def schedule_rebump(scopes):
+    due = time.monotonic() + settings.REPLICA_STICKY_SECONDS
+    with _lock:
+        for scope in scopes:
+            _rebumps[scope] = due
+        start_rebump_timer()
+
+
+def start_rebump_timer():
+    """Один таймер на процесс до ближайшей повторной смены версий.
+    Вызывается под _lock."""
+    global _timer
+    if _timer is not None or not _rebumps:
+        return
+    delay = max(min(_rebumps.values()) - time.monotonic(), 0)
+    _timer = threading.Timer(delay, run_rebumps)
+    _timer.daemon = True
+    _timer.start()
+
+
+def run_rebumps():
+    global _timer
+    now = time.monotonic()
+    with _lock:
+        scopes = [scope for scope, due in _rebumps.items() if due <= now]
+        for scope in scopes:
+            del _rebumps[scope]
+        _timer = None
+        start_rebump_timer()
+    if scopes:
+        set_feed_versions(scopes)
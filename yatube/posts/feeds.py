@@ -0,0 +1,35 @@
+from django.db.models import Subquery
+
+from .models import Follow, Post
+from .sharding import author_posts, is_sharded, related, scatter
+
+
+def index_list():
+    return scatter(related(Post.objects.all(), 'author', 'group'))
+
+
+def group_list(group):
+    return scatter(related(group.posts.all(), 'author'))
+
+
+def profile_list(author):
+    return related(author.posts.all(), 'group')
+
+
+def follow_list(user):
+    if is_sharded():
+        return author_posts(
+            related(Post.objects.all(), 'author', 'group'),
+            Follow.objects.filter(user=user).values_list('author_id',
+                                                         flat=True)
+        )
+    following = Follow.objects.filter(user=user).values('author_id')
+    return Post.objects.filter(
+        author_id__in=Subquery(following)
+    ).select_related('author', 'group')
+
+
+def follow_count_list(user):
+    if is_sharded():
+        return None
+    return Post.objects.filter(author__following__user=user)
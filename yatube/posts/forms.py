@@ -1,6 +1,7 @@
 from django import forms
 
-from .models import Post, Comment, Obscene
+from .models import Post, Comment
+from .obscene import get_matcher
 
 
 class PostForm(forms.ModelForm):
@@ -20,9 +21,5 @@ class CommentForm(forms.ModelForm):
         fields = ('text',)
 
     def clean_text(self):
-        obscene = set(Obscene.objects.values_list('word', flat=True))
-        text_list = self.cleaned_data['text'].split()
-        for i, word in enumerate(text_list):
-            if word.strip().lower() in obscene:
-                text_list[i] = '*' * len(text_list[i])
-        return ' '.join(text_list)
+        text = ' '.join(self.cleaned_data['text'].split())
+        return get_matcher().censor(text)
@@ -0,0 +1,42 @@
+from http import HTTPStatus
+
+from django.http import HttpResponse, JsonResponse
+from django.template.loader import render_to_string
+
+FORM_ERRORS_TEMPLATE = 'posts/includes/form_errors.html'
+
+
+def response_format(request):
+    """'json' для Accept: application/json, 'fragment' для AJAX-запросов,
+    None — обычная форма с редиректом."""
+    if 'application/json' in request.META.get('HTTP_ACCEPT', ''):
+        return 'json'
+    if request.is_ajax():
+        return 'fragment'
+    return None
+
+
+def fragment_response(request, response_format, template, context, data,
+                      status=HTTPStatus.OK):
+    """Только отрисованный фрагмент, в JSON — вместе с data."""
+    html = render_to_string(template, context, request)
+    if response_format == 'json':
+        return JsonResponse(dict(data, html=html), status=status)
+    return HttpResponse(html, status=status)
+
+
+def form_errors_response(request, response_format, form):
+    if response_format == 'json':
+        return JsonResponse({'errors': form.errors.get_json_data()},
+                            status=HTTPStatus.BAD_REQUEST)
+    return HttpResponse(
+        render_to_string(FORM_ERRORS_TEMPLATE, {'form': form}, request),
+        status=HTTPStatus.BAD_REQUEST
+    )
+
+
+def forbidden_response(response_format):
+    if response_format == 'json':
+        return JsonResponse({'detail': 'Недостаточно прав.'},
+                            status=HTTPStatus.FORBIDDEN)
+    return HttpResponse(status=HTTPStatus.FORBIDDEN)
@@ -0,0 +1,84 @@
+import random
+import string
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.bench import summarize
+from posts.obscene import STEM_MARK, ObsceneMatcher
+
+
+def random_word(rng, alphabet):
+    return ''.join(rng.choices(alphabet, k=rng.randint(4, 12)))
+
+
+def legacy_censor(words, text):
+    obscene = set(words)
+    text_list = text.split()
+    for i, word in enumerate(text_list):
+        if word.strip().lower() in obscene:
+            text_list[i] = '*' * len(text_list[i])
+    return ' '.join(text_list)
+
+
+def measure(function, comments):
+    latencies = []
+    for comment in comments:
+        started = time.perf_counter()
+        function(comment)
+        latencies.append(time.perf_counter() - started)
+    return summarize(latencies)
+
+
+class Command(BaseCommand):
+    help = ('Измеряет стоимость проверки одного комментария '
+            'на запрещенные слова при разных размерах словаря.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+',
+                            default=[10000, 100000, 1000000])
+        parser.add_argument('--comments', type=int, default=1000)
+        parser.add_argument('--legacy-comments', type=int, default=20)
+        parser.add_argument('--comment-words', type=int, default=40)
+        parser.add_argument('--stem-share', type=float, default=0.1)
+        parser.add_argument('--obscene-share', type=float, default=0.05)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        alphabet = string.ascii_lowercase + 'абвгдежзийклмнопрстуфхцчшщыэюя'
+        self.stdout.write(
+            f'{"words":>9} {"build s":>8} {"p50":>9} {"p95":>9} '
+            f'{"p99":>9} {"legacy p50":>11}'
+        )
+        for size in options['sizes']:
+            words = [
+                random_word(rng, alphabet)
+                + (STEM_MARK if rng.random() < options['stem_share'] else '')
+                for _ in range(size)
+            ]
+            banned = [word.rstrip(STEM_MARK) + 'ами' for word in words[:100]]
+            comments = [
+                ', '.join(
+                    rng.choice(banned)
+                    if rng.random() < options['obscene_share']
+                    else random_word(rng, alphabet)
+                    for _ in range(options['comment_words'])
+                ) + '!'
+                for _ in range(options['comments'])
+            ]
+            started = time.perf_counter()
+            matcher = ObsceneMatcher(words)
+            build = time.perf_counter() - started
+            compiled = measure(matcher.censor, comments)
+            legacy = measure(
+                lambda comment: legacy_censor(words, comment),
+                comments[:options['legacy_comments']]
+            )
+            self.stdout.write(
+                f'{size:>9} {build:>8.2f} '
+                f'{compiled["p50"] * 1000000:>7.1f}us '
+                f'{compiled["p95"] * 1000000:>7.1f}us '
+                f'{compiled["p99"] * 1000000:>7.1f}us '
+                f'{legacy["p50"] * 1000:>9.2f}ms'
+            )
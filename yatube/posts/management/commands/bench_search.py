@@ -0,0 +1,128 @@
+import itertools
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.bench import summarize
+from posts.search import (FTS_CREATE, FTS_FILL, FTS_TABLE, HIGHLIGHT_END,
+                          HIGHLIGHT_START, SNIPPET_WORDS,
+                          SQLiteSearchBackend)
+
+FTS_QUERY = (
+    f'SELECT posts_post.id, {FTS_TABLE}.rank, '
+    f"snippet({FTS_TABLE}, 0, ?, ?, '…', {SNIPPET_WORDS}) "
+    f'FROM posts_post, {FTS_TABLE} '
+    f'WHERE {FTS_TABLE}.rowid = posts_post.id AND {FTS_TABLE} MATCH ? '
+    f'ORDER BY {FTS_TABLE}.rank, posts_post.id LIMIT ?'
+)
+LIKE_QUERY = (
+    'SELECT id, text FROM posts_post WHERE text LIKE ? '
+    'ORDER BY id DESC LIMIT ?'
+)
+LIKE_COUNT_QUERY = 'SELECT COUNT(*) FROM posts_post WHERE text LIKE ?'
+
+
+def build_database(path, options, rng):
+    alphabet = 'абвгдежзийклмнопрстуфхцчшщыэюя'
+    vocabulary = [
+        ''.join(rng.choices(alphabet, k=rng.randint(3, 10)))
+        for _ in range(options['vocabulary'])
+    ]
+    weights = list(itertools.accumulate(
+        1 / (rank + 1) for rank in range(len(vocabulary))
+    ))
+    connection = sqlite3.connect(path, isolation_level=None)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=OFF')
+    connection.execute(
+        'CREATE TABLE posts_post (id INTEGER PRIMARY KEY, text TEXT)'
+    )
+    connection.execute('BEGIN')
+    for start in range(0, options['posts'], options['batch']):
+        stop = min(start + options['batch'], options['posts'])
+        connection.executemany(
+            'INSERT INTO posts_post (id, text) VALUES (?, ?)',
+            ((pk, ' '.join(rng.choices(vocabulary, cum_weights=weights,
+                                       k=options['words'])))
+             for pk in range(start + 1, stop + 1))
+        )
+    connection.execute('COMMIT')
+    started = time.perf_counter()
+    connection.execute(FTS_CREATE)
+    connection.execute(FTS_FILL)
+    connection.execute(
+        f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')"
+    )
+    return connection, vocabulary, time.perf_counter() - started
+
+
+def measure(connection, sql, params_list):
+    latencies = []
+    for params in params_list:
+        started = time.perf_counter()
+        connection.execute(sql, params).fetchall()
+        latencies.append(time.perf_counter() - started)
+    return summarize(latencies)
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает поиск по FTS5 с ранжированием и LIKE '
+            'на синтетической таблице постов.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000000)
+        parser.add_argument('--words', type=int, default=30)
+        parser.add_argument('--vocabulary', type=int, default=50000)
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--like-queries', type=int, default=20)
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument('--batch', type=int, default=10000)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--location', default=None)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        path = options['location'] or os.path.join(
+            tempfile.mkdtemp(), 'bench_search.sqlite3'
+        )
+        connection, vocabulary, build = build_database(path, options, rng)
+        self.stdout.write(
+            f'Постов: {options["posts"]}, индекс построен за {build:.1f} с'
+        )
+        backend = SQLiteSearchBackend()
+        queries = [
+            ' '.join(rng.sample(vocabulary[:2000], rng.randint(1, 2)))
+            for _ in range(options['queries'])
+        ]
+        limit = options['limit']
+        results = {
+            'fts': measure(connection, FTS_QUERY, [
+                (HIGHLIGHT_START, HIGHLIGHT_END,
+                 backend.match_expression(query), limit)
+                for query in queries
+            ]),
+            'like': measure(connection, LIKE_QUERY, [
+                (f'%{query.split()[0]}%', limit)
+                for query in queries[:options['like_queries']]
+            ]),
+            'count': measure(connection, LIKE_COUNT_QUERY, [
+                (f'%{query.split()[0]}%',)
+                for query in queries[:options['like_queries']]
+            ]),
+        }
+        self.stdout.write(
+            f'{"query":<6} {"count":>6} {"mean":>10} {"p50":>10} '
+            f'{"p95":>10} {"p99":>10}'
+        )
+        for name, stats in results.items():
+            self.stdout.write(
+                f'{name:<6} {stats["count"]:>6} '
+                f'{stats["mean"] * 1000:>8.2f}ms '
+                f'{stats["p50"] * 1000:>8.2f}ms '
+                f'{stats["p95"] * 1000:>8.2f}ms '
+                f'{stats["p99"] * 1000:>8.2f}ms'
+            )
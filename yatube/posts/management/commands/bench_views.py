@@ -0,0 +1,254 @@
+import gc
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+
+import django
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import (CaptureQueriesContext, override_settings,
+                               setup_test_environment,
+                               teardown_test_environment)
+from django.urls import reverse
+
+from core.bench import summarize
+from posts.models import AuthorStats, Group, Post
+
+PAGES = 5
+DATASET = {
+    'users': 300,
+    'groups': 20,
+    'posts': 6000,
+    'comments': 12000,
+    'follows_per_user': 30,
+}
+BENCH_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bench_views',
+    }
+}
+NO_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    }
+}
+
+
+def bench_targets():
+    """Самые тяжелые объекты набора данных: их страницы и меряются."""
+    return {
+        'group': Group.objects.annotate(
+            total=Count('posts')
+        ).order_by('-total', 'pk').first(),
+        'author': AuthorStats.objects.select_related('author').order_by(
+            '-posts_count', 'pk'
+        ).first().author,
+        'reader': AuthorStats.objects.select_related('author').order_by(
+            '-following_count', 'pk'
+        ).first().author,
+        'post': Post.objects.order_by('-comments_count', 'pk').first(),
+    }
+
+
+def scenarios(targets):
+    """Запросы сценариев: имя → функция (клиенты, номер итерации) →
+    ответ."""
+    group, author, post = targets['group'], targets['author'], targets['post']
+
+    def page(url, number):
+        return f'{url}?page={number % PAGES + 1}'
+
+    return {
+        'index': lambda clients, number: clients['anonymous'].get(
+            page(reverse('posts:index'), number)
+        ),
+        'group_posts': lambda clients, number: clients['anonymous'].get(
+            page(reverse('posts:group_detail', args=[group.slug]), number)
+        ),
+        'profile': lambda clients, number: clients['anonymous'].get(
+            page(reverse('posts:profile', args=[author.username]), number)
+        ),
+        'post_detail': lambda clients, number: clients['reader'].get(
+            reverse('posts:post_detail', args=[post.pk])
+        ),
+        'follow_index': lambda clients, number: clients['reader'].get(
+            page(reverse('posts:follow_index'), number)
+        ),
+        'add_comment': lambda clients, number: clients['reader'].post(
+            reverse('posts:add_comment', args=[post.pk]),
+            {'text': f'Комментарий {number}'}
+        ),
+        'post_create': lambda clients, number: clients['reader'].post(
+            reverse('posts:post_create'), {'text': f'Пост {number}'}
+        ),
+    }
+
+
+def call(scenario, clients, number):
+    response = scenario(clients, number)
+    if response.status_code >= 400:
+        raise CommandError(f'Ответ {response.status_code}')
+    return response
+
+
+def measure(scenario, clients, iterations, warmup, memory_iterations):
+    for number in range(warmup):
+        call(scenario, clients, number)
+    gc.collect()
+    latencies = []
+    queries = []
+    for number in range(warmup, warmup + iterations):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            call(scenario, clients, number)
+            latencies.append(time.perf_counter() - started)
+        queries.append(len(captured))
+    peaks = []
+    tracemalloc.start()
+    try:
+        for number in range(memory_iterations):
+            tracemalloc.clear_traces()
+            call(scenario, clients, warmup + iterations + number)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+    finally:
+        tracemalloc.stop()
+    summary = summarize(latencies)
+    return {
+        'count': summary['count'],
+        **{name: round(summary[name] * 1000, 3)
+           for name in ('mean', 'p50', 'p95', 'p99')},
+        'queries': max(queries),
+        'bytes': int(statistics.median(peaks)) if peaks else 0,
+    }
+
+
+def run_benchmarks(iterations, warmup=5, memory_iterations=5):
+    """Прогон всех сценариев на текущей базе. Латентность — в мс,
+    bytes — медиана пика памяти Python за запрос (tracemalloc,
+    отдельным проходом, чтобы не искажать латентность)."""
+    targets = bench_targets()
+    clients = {'anonymous': Client(), 'reader': Client()}
+    clients['reader'].force_login(targets['reader'])
+    return {
+        name: measure(scenario, clients, iterations, warmup,
+                      memory_iterations)
+        for name, scenario in scenarios(targets).items()
+    }
+
+
+def regressions(results, baseline, thresholds):
+    """Метрики, которые выросли и больше допустимой доли от базовых,
+    и больше абсолютного порога: доли миллисекунды — шум."""
+    found = []
+    for view, metrics in results.items():
+        base = baseline.get(view)
+        if base is None:
+            continue
+        for metric, (share, delta) in thresholds.items():
+            if metric not in base or metric not in metrics:
+                continue
+            limit = max(base[metric] * (1 + share), base[metric] + delta)
+            if metrics[metric] > limit:
+                found.append(f'{view}.{metric}: {metrics[metric]} > '
+                             f'{base[metric]} (+{share:.0%}, +{delta})')
+    return found
+
+
+class Command(BaseCommand):
+    help = ('Замеряет представления постов через тестовый клиент на '
+            'тестовой базе с фиксированным набором данных: p50/p95/p99, '
+            'число запросов и пик памяти. Пишет JSON и падает, если '
+            'метрика хуже базовой больше порога из BENCH_THRESHOLDS.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=100)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--memory-iterations', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--no-cache', action='store_true',
+                            help='Мерить без кэша (DummyCache).')
+        parser.add_argument('--output', default=None)
+        parser.add_argument('--baseline', default=settings.BENCH_BASELINE)
+        parser.add_argument('--update-baseline', action='store_true')
+
+    def handle(self, *args, **options):
+        results = {
+            'meta': {
+                'dataset': DATASET,
+                'seed': options['seed'],
+                'cache': not options['no_cache'],
+                'iterations': options['iterations'],
+                'python': platform.python_version(),
+                'django': django.get_version(),
+            },
+            'views': self.run(options),
+        }
+        self.report(results['views'])
+        if options['output']:
+            self.dump(results, options['output'])
+        if options['update_baseline']:
+            self.dump(results, options['baseline'])
+            self.stdout.write(f'Базовые значения: {options["baseline"]}')
+            return
+        try:
+            with open(options['baseline'], encoding='utf-8') as file:
+                baseline = json.load(file)
+        except FileNotFoundError:
+            self.stdout.write('Базовых значений нет, сравнение пропущено')
+            return
+        for key in ('dataset', 'seed', 'cache'):
+            if baseline['meta'].get(key) != results['meta'][key]:
+                raise CommandError(
+                    f'Базовые значения сняты с другим {key}: '
+                    f'{baseline["meta"].get(key)}'
+                )
+        found = regressions(results['views'], baseline['views'],
+                            settings.BENCH_THRESHOLDS)
+        if found:
+            raise CommandError('Регрессии:\n' + '\n'.join(found))
+        self.stdout.write(self.style.SUCCESS('Регрессий нет'))
+
+    def run(self, options):
+        old_name = connection.settings_dict['NAME']
+        setup_test_environment()
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            with override_settings(
+                CACHES=NO_CACHES if options['no_cache'] else BENCH_CACHES,
+                THUMBNAIL_WORKERS=0
+            ):
+                caches['default'].clear()
+                call_command('generate_load_data', seed=options['seed'],
+                             workers=0, stdout=self.stdout, **DATASET)
+                return run_benchmarks(options['iterations'],
+                                      options['warmup'],
+                                      options['memory_iterations'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def report(self, views):
+        self.stdout.write(
+            f'{"view":<14} {"p50":>9} {"p95":>9} {"p99":>9} '
+            f'{"queries":>8} {"bytes":>10}'
+        )
+        for name, metrics in views.items():
+            self.stdout.write(
+                f'{name:<14} {metrics["p50"]:>7.2f}ms '
+                f'{metrics["p95"]:>7.2f}ms {metrics["p99"]:>7.2f}ms '
+                f'{metrics["queries"]:>8} {metrics["bytes"]:>10}'
+            )
+
+    def dump(self, results, path):
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(results, file, ensure_ascii=False, indent=2,
+                      sort_keys=True)
+            file.write('\n')
@@ -0,0 +1,344 @@
+import collections
+import contextlib
+import math
+import multiprocessing
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+
+from posts.feed_cache import GROUPS, INDEX, bump_feed_versions
+from posts.models import Comment, Follow, Group, Post
+from posts.search import search_backend
+from posts.sharding import is_sharded, last_id, reserve_ids
+from posts.stats import rebuild_author_stats, rebuild_comments_count
+from posts.timeline import rebuild_timeline
+
+User = get_user_model()
+
+FOLLOWS_EXPONENT = 2.0
+DEFAULT_START = '2021-01-01'
+_fakers = {}
+
+
+def power_law_index(rng, size, exponent):
+    """Индекс 0..size-1 с вероятностью ~ 1 / (индекс + 1) ** exponent:
+    обратная функция распределения степенного закона, без таблиц."""
+    u = rng.random()
+    if exponent == 1:
+        value = (size + 1) ** u
+    else:
+        power = 1 - exponent
+        value = (1 + u * ((size + 1) ** power - 1)) ** (1 / power)
+    return min(int(value) - 1, size - 1)
+
+
+def spread_step(size):
+    """Шаг перестановки индексов: популярными становятся не первые id,
+    а разбросанные по всей таблице."""
+    step = int(size * 0.6180339887) | 1
+    while math.gcd(step, size) != 1:
+        step += 2
+    return step
+
+
+def popular_id(rng, first_id, size, exponent):
+    index = power_law_index(rng, size, exponent)
+    return first_id + index * spread_step(size) % size
+
+
+def follows_count(rng, mean, limit):
+    """Число подписок по Парето с показателем 2: у большинства немного,
+    у единиц — в десятки раз больше среднего."""
+    scale = mean * (FOLLOWS_EXPONENT - 1) / FOLLOWS_EXPONENT
+    count = scale * (1 - rng.random()) ** (-1 / FOLLOWS_EXPONENT)
+    return min(int(count), limit)
+
+
+def chunk_random(params, kind, chunk):
+    seed = f'{params["seed"]}:{kind}:{chunk}'
+    fake = _fakers.get(params['locale'])
+    if fake is None:
+        fake = _fakers[params['locale']] = Faker(params['locale'])
+    fake.seed_instance(seed)
+    return random.Random(seed), fake
+
+
+def post_date(params, number):
+    return params['start'] + params['span'] * number / params['posts']
+
+
+def group_rows(params, chunk, start, stop):
+    rng, fake = chunk_random(params, 'groups', chunk)
+    return [{
+        'pk': params['first_group_id'] + number,
+        'title': f'{fake.word().capitalize()} {number}',
+        'slug': f'{params["prefix"]}-group-{number}',
+        'description': fake.sentence(),
+    } for number in range(start, stop)]
+
+
+def user_rows(params, chunk, start, stop):
+    rng, fake = chunk_random(params, 'users', chunk)
+    return [{
+        'pk': params['first_user_id'] + number,
+        'username': f'{params["prefix"]}{number}',
+        'first_name': fake.first_name(),
+        'last_name': fake.last_name(),
+        'email': f'{params["prefix"]}{number}@example.com',
+        'password': params['password'],
+        'date_joined': params['start'],
+    } for number in range(start, stop)]
+
+
+def post_rows(params, chunk, start, stop):
+    rng, fake = chunk_random(params, 'posts', chunk)
+    rows = []
+    for number in range(start, stop):
+        group_id = None
+        if params['groups'] and rng.random() < params['group_share']:
+            group_id = popular_id(rng, params['first_group_id'],
+                                  params['groups'], 1.0)
+        pub_date = post_date(params, number)
+        rows.append({
+            'pk': params['first_post_id'] + number,
+            'author_id': popular_id(rng, params['first_user_id'],
+                                    params['users'], params['exponent']),
+            'group_id': group_id,
+            'text': fake.text(max_nb_chars=rng.randint(80, 600)),
+            'pub_date': pub_date,
+            'updated': pub_date,
+        })
+    return rows
+
+
+def follow_rows(params, chunk, start, stop):
+    rng, _ = chunk_random(params, 'follows', chunk)
+    rows = []
+    limit = params['users'] - 1
+    for number in range(start, stop):
+        user_id = params['first_user_id'] + number
+        wanted = follows_count(rng, params['follows_per_user'], limit)
+        authors = set()
+        for _ in range(wanted * 3):
+            if len(authors) >= wanted:
+                break
+            author_id = popular_id(rng, params['first_user_id'],
+                                   params['users'], params['exponent'])
+            if author_id != user_id:
+                authors.add(author_id)
+        rows.extend({'user_id': user_id, 'author_id': author_id}
+                    for author_id in sorted(authors))
+    return rows
+
+
+def comment_rows(params, chunk, start, stop):
+    rng, fake = chunk_random(params, 'comments', chunk)
+    rows = []
+    for number in range(start, stop):
+        post_number = power_law_index(rng, params['posts'],
+                                      params['exponent'])
+        post_number = post_number * spread_step(params['posts']) % (
+            params['posts']
+        )
+        delay = timedelta(seconds=rng.expovariate(1 / 3600))
+        rows.append({
+            'pk': params['first_comment_id'] + number,
+            'post_id': params['first_post_id'] + post_number,
+            'author_id': popular_id(rng, params['first_user_id'],
+                                    params['users'], params['exponent']),
+            'text': fake.sentence(nb_words=rng.randint(3, 25)),
+            'pub_date': min(post_date(params, post_number) + delay,
+                            params['end']),
+        })
+    return rows
+
+
+GENERATORS = {
+    'groups': group_rows,
+    'users': user_rows,
+    'posts': post_rows,
+    'follows': follow_rows,
+    'comments': comment_rows,
+}
+
+
+def generate_chunk(task):
+    kind, params, chunk, start, stop = task
+    return kind, GENERATORS[kind](params, chunk, start, stop)
+
+
+@contextlib.contextmanager
+def explicit_dates():
+    """bulk_create сам проставляет auto_now/auto_now_add; на время
+    генерации даты берутся из строк."""
+    fields = [Post._meta.get_field('pub_date'),
+              Post._meta.get_field('updated'),
+              Comment._meta.get_field('pub_date')]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def start_date(value):
+    """Дата или дата и время в ISO 8601; без часового пояса — UTC."""
+    moment = datetime.fromisoformat(value)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment, timezone.utc)
+    return moment
+
+
+def next_id(model):
+    return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+
+class Command(BaseCommand):
+    help = ('Наполняет базу синтетическими пользователями, группами, '
+            'постами, подписками и комментариями для нагрузочных тестов. '
+            'При одинаковых --seed, --start, --days и --batch-size '
+            'данные совпадают. '
+            'С POST_SHARDS посты пишутся в основную базу, после генерации '
+            'запустите rebalance_shards.')
+
+    MODELS = {
+        'groups': Group,
+        'users': User,
+        'posts': Post,
+        'follows': Follow,
+        'comments': Comment,
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--follows-per-user', type=float, default=20)
+        parser.add_argument('--comments', type=int, default=None,
+                            help='По умолчанию — два на пост.')
+        parser.add_argument('--exponent', type=float, default=1.1,
+                            help='Показатель степенного закона '
+                                 'популярности авторов и постов.')
+        parser.add_argument('--group-share', type=float, default=0.7)
+        parser.add_argument('--start', type=start_date,
+                            default=DEFAULT_START,
+                            help='Дата первого поста и регистрации '
+                                 'пользователей, ISO 8601.')
+        parser.add_argument('--days', type=int, default=365,
+                            help='Сколько дней после --start занимают '
+                                 'посты.')
+        parser.add_argument('--prefix', default='load')
+        parser.add_argument('--password', default='load-password')
+        parser.add_argument('--locale', default='ru_RU')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--workers', type=int,
+                            default=multiprocessing.cpu_count())
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        posts = options['posts']
+        first_post_id = max(
+            last_id(alias)
+            for alias in {DEFAULT_DB_ALIAS, *settings.POST_SHARDS}
+        ) + 1
+        params = {
+            'seed': options['seed'],
+            'locale': options['locale'],
+            'prefix': options['prefix'],
+            'password': make_password(options['password']),
+            'users': options['users'],
+            'groups': options['groups'],
+            'posts': posts,
+            'follows_per_user': options['follows_per_user'],
+            'exponent': options['exponent'],
+            'group_share': options['group_share'],
+            'start': options['start'],
+            'end': options['start'] + timedelta(days=options['days']),
+            'span': timedelta(days=options['days']),
+            'first_user_id': next_id(User),
+            'first_group_id': next_id(Group),
+            'first_post_id': first_post_id,
+            'first_comment_id': first_post_id + posts,
+        }
+        comments = options['comments']
+        if comments is None:
+            comments = posts * 2
+        sizes = {
+            'groups': options['groups'],
+            'users': options['users'],
+            'posts': posts if options['users'] else 0,
+            'follows': options['users'] if options['users'] > 1 else 0,
+            'comments': comments if posts and options['users'] else 0,
+        }
+        with explicit_dates(), self.executor(options['workers']) as run:
+            for kind, size in sizes.items():
+                started = time.perf_counter()
+                rows = self.write(run, kind, params, size,
+                                  options['batch_size'],
+                                  options['workers'])
+                self.stdout.write(
+                    f'{kind}: {rows} за {time.perf_counter() - started:.1f} с'
+                )
+        self.finish(params, posts + comments)
+
+    @contextlib.contextmanager
+    def executor(self, workers):
+        if not workers:
+            yield lambda tasks: map(generate_chunk, tasks)
+            return
+        with ProcessPoolExecutor(
+            workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=django.setup
+        ) as executor:
+            def run(tasks):
+                """Результаты по порядку; в работе не больше двух задач
+                на процесс, чтобы готовые пачки не копились в памяти."""
+                pending = collections.deque()
+                for task in tasks:
+                    pending.append(executor.submit(generate_chunk, task))
+                    if len(pending) >= workers * 2:
+                        yield pending.popleft().result()
+                while pending:
+                    yield pending.popleft().result()
+            yield run
+
+    def write(self, run, kind, params, size, batch_size, workers):
+        model = self.MODELS[kind]
+        tasks = (
+            (kind, params, chunk, start, min(start + batch_size, size))
+            for chunk, start in enumerate(range(0, size, batch_size))
+        )
+        total = 0
+        for _, rows in run(tasks):
+            with transaction.atomic():
+                model.objects.bulk_create(model(**row) for row in rows)
+            total += len(rows)
+        return total
+
+    def finish(self, params, ids):
+        if is_sharded():
+            reserve_ids(params['first_post_id'] + ids - 1)
+        rebuild_comments_count()
+        authors = rebuild_author_stats()
+        indexed = search_backend().rebuild()
+        if settings.TIMELINE_ENABLED:
+            rebuild_timeline()
+        bump_feed_versions(INDEX, GROUPS)
+        self.stdout.write(self.style.SUCCESS(
+            f'Данные созданы, авторов: {authors}, в поиске: {indexed}'
+        ))
@@ -0,0 +1,42 @@
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.sharding import each_shard
+from posts.thumbnails import generate_thumbnails
+
+
+class Command(BaseCommand):
+    help = ('Создает миниатюры всех размеров из POST_THUMBNAILS '
+            'для уже загруженных картинок постов.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int,
+                            default=settings.THUMBNAIL_WORKERS)
+        parser.add_argument('--chunksize', type=int, default=20)
+
+    def handle(self, *args, **options):
+        names = itertools.chain.from_iterable(
+            queryset.values_list('image', flat=True).order_by('pk').iterator()
+            for queryset in each_shard(Post.objects.exclude(image=''))
+        )
+        if options['workers']:
+            with ProcessPoolExecutor(
+                options['workers'],
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=django.setup
+            ) as executor:
+                count = sum(1 for _ in executor.map(
+                    generate_thumbnails, names,
+                    chunksize=options['chunksize']
+                ))
+        else:
+            count = sum(1 for _ in map(generate_thumbnails, names))
+        self.stdout.write(self.style.SUCCESS(
+            f'Миниатюры созданы для картинок: {count}'
+        ))
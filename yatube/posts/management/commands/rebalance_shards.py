@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.sharding import is_sharded, rebalance
+
+
+class Command(BaseCommand):
+    help = ('Переносит посты и комментарии в шарды их авторов по текущему '
+            'POST_SHARDS, в том числе из основной базы.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if not is_sharded():
+            raise CommandError('POST_SHARDS не задан.')
+        moved = rebalance(options['batch_size'])
+        for (source, target), count in sorted(moved.items()):
+            self.stdout.write(f'{source} → {target}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено постов: {sum(moved.values())}'
+        ))
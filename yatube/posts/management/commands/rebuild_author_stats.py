@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from posts.stats import rebuild_author_stats, rebuild_comments_count
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает счетчики постов, подписчиков и подписок '
+            'авторов (AuthorStats) и счетчики комментариев постов.')
+
+    def handle(self, *args, **options):
+        count = rebuild_author_stats()
+        posts = rebuild_comments_count()
+        self.stdout.write(self.style.SUCCESS(
+            f'Счетчики пересчитаны, авторов: {count}, постов: {posts}'
+        ))
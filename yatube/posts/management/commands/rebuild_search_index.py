@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.search import search_backend
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает поисковый индекс постов.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            count = search_backend().rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Индекс пересобран, постов: {count}'
+        ))
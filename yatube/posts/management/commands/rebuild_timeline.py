@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from posts.timeline import rebuild_timeline
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает персональные ленты подписок (TimelineEntry).'
+
+    def handle(self, *args, **options):
+        count = rebuild_timeline()
+        self.stdout.write(self.style.SUCCESS(
+            f'Лента пересобрана, записей: {count}'
+        ))
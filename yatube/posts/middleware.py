@@ -0,0 +1,123 @@
+import copy
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.urls import Resolver404, resolve
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+from core.singleflight import start_refresh
+
+from .conditional import group_state, index_state, page_state, profile_state
+
+CACHED_VIEWS = {
+    'posts:index': index_state,
+    'posts:group_detail': group_state,
+    'posts:profile': profile_state,
+}
+SKIPPED_HEADERS = ('set-cookie', 'x-page-cache')
+
+
+class AnonymousPageCacheMiddleware:
+    """Кэширует целые страницы лент для анонимных посетителей.
+
+    Запись действительна, пока не изменились версии лент страницы.
+    После PAGE_CACHE_TIMEOUT запись устаревает: ее еще отдают
+    (не дольше PAGE_CACHE_STALE_TIMEOUT), а страницу пересобирает
+    один фоновый поток.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state_func, kwargs = self.cached_view(request)
+        if state_func is None:
+            return self.get_response(request)
+        state = page_state(request, state_func, **kwargs)
+        if state is None:
+            return self.get_response(request)
+        version = '.'.join(str(version) for version in state[0])
+        key = self.cache_key(request)
+        entry = cache.get(key)
+        if entry is not None and entry['version'] == version:
+            if time.time() < entry['fresh_until']:
+                return self.cached_response(request, entry, 'hit')
+            lock_key = f'{key}:lock'
+            if cache.add(lock_key, 1, settings.PAGE_CACHE_LOCK_TIMEOUT):
+                start_refresh(
+                    lambda: self.refresh(request, key, lock_key, version)
+                )
+            return self.cached_response(request, entry, 'stale')
+        response = self.get_response(request)
+        self.store(request, response, key, version)
+        response['X-Page-Cache'] = 'miss'
+        return response
+
+    def cached_view(self, request):
+        if request.method != 'GET' or not settings.PAGE_CACHE_TIMEOUT:
+            return None, None
+        if (settings.SESSION_COOKIE_NAME in request.COOKIES
+                or CookieStorage.cookie_name in request.COOKIES):
+            return None, None
+        if request.user.is_authenticated:
+            return None, None
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return None, None
+        return CACHED_VIEWS.get(match.view_name), match.kwargs
+
+    def cache_key(self, request):
+        url = request.build_absolute_uri()
+        return 'page_cache:' + hashlib.md5(url.encode()).hexdigest()
+
+    def cacheable(self, request, response):
+        session = getattr(request, 'session', None)
+        return (response.status_code == 200
+                and not response.streaming
+                and not response.cookies
+                and not request.META.get('CSRF_COOKIE_USED')
+                and not (session is not None and session.modified)
+                and 'private' not in response.get('Cache-Control', ''))
+
+    def store(self, request, response, key, version):
+        if not self.cacheable(request, response):
+            return
+        entry = {
+            'version': version,
+            'fresh_until': time.time() + settings.PAGE_CACHE_TIMEOUT,
+            'status': response.status_code,
+            'content': response.content,
+            'headers': [(name, value) for name, value in response.items()
+                        if name.lower() not in SKIPPED_HEADERS],
+        }
+        cache.set(key, entry, settings.PAGE_CACHE_TIMEOUT
+                  + settings.PAGE_CACHE_STALE_TIMEOUT)
+
+    def refresh(self, request, key, lock_key, version):
+        try:
+            refresh_request = copy.copy(request)
+            response = self.get_response(refresh_request)
+            self.store(refresh_request, response, key, version)
+        finally:
+            cache.delete(lock_key)
+
+    def cached_response(self, request, entry, status):
+        response = HttpResponse(entry['content'], status=entry['status'])
+        for name, value in entry['headers']:
+            response[name] = value
+        response = get_conditional_response(
+            request,
+            etag=response.get('ETag'),
+            last_modified=parse_http_date_safe(
+                response.get('Last-Modified', '')
+            ),
+            response=response,
+        )
+        response['X-Page-Cache'] = status
+        return response
@@ -0,0 +1,23 @@
+# Generated by Django 2.2.16 on 2026-10-17 07:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0026_post_comments_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShardedId',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+            ],
+            options={
+                'verbose_name': 'Идентификатор шардированной записи',
+                'verbose_name_plural': 'Идентификаторы шардированных записей',
+            },
+        ),
+    ]
@@ -6,6 +6,16 @@ from django.db.models import Q, F
 User = get_user_model()
 
 
+class RoutedQuerySet(models.QuerySet):
+    def create(self, **kwargs):
+        """Без явного using() базу выбирает роутер по самому объекту:
+        при POST_SHARDS это шард автора поста."""
+        obj = self.model(**kwargs)
+        self._for_write = True
+        obj.save(force_insert=True, using=self._db)
+        return obj
+
+
 class Group(models.Model):
     title = models.CharField(
         max_length=200,
@@ -34,6 +44,9 @@ class Post(models.Model):
     pub_date = models.DateTimeField(
         auto_now_add=True,
         verbose_name='Дата публикации')
+    updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения')
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -55,11 +68,25 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Комментариев')
+
+    objects = RoutedQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='post_group_pub_date_idx'),
+            models.Index(fields=['-pub_date', '-id'],
+                         name='post_pub_date_id_idx'),
+        ]
 
     def __str__(self):
         return self.text[:settings.POST_STR_LIMIT]
@@ -85,9 +112,16 @@ class Comment(models.Model):
         auto_now_add=True,
         verbose_name='Дата публикации')
 
+    objects = RoutedQuerySet.as_manager()
+
     class Meta:
+        ordering = ('pub_date', 'id')
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(fields=['post', 'pub_date', 'id'],
+                         name='comment_post_pub_date_idx'),
+        ]
 
     def __str__(self):
         return self.text[:settings.COMMENT_STR_LIMIT]
@@ -117,6 +151,10 @@ class Follow(models.Model):
             models.CheckConstraint(check=~Q(user_id=F('author_id')),
                                    name='not_following_self',),
         ]
+        indexes = [
+            models.Index(fields=['author', 'user'],
+                         name='follow_author_user_idx'),
+        ]
 
     def __str__(self):
         return self.user.username + ' подписан на ' + self.author.username
@@ -134,3 +172,71 @@ class Obscene(models.Model):
     class Meta:
         verbose_name = 'Слово'
         verbose_name_plural = 'Слова'
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='unique_timeline_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-post'],
+                         name='timeline_user_pub_date_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user} ← {self.post}'
+
+
+class AuthorStats(models.Model):
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Автор'
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Постов')
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Подписчиков')
+    following_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Подписок')
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+    def __str__(self):
+        return f'Статистика {self.author}'
+
+
+class ShardedId(models.Model):
+    """Последовательность id постов и комментариев при POST_SHARDS:
+    своя таблица в каждом шарде, id из нее — см.
+    posts.sharding.allocate_id."""
+
+    class Meta:
+        verbose_name = 'Идентификатор шардированной записи'
+        verbose_name_plural = 'Идентификаторы шардированных записей'
@@ -0,0 +1,81 @@
+import re
+import threading
+
+from django.core.cache import cache
+
+from .feed_cache import new_version
+from .models import Obscene
+
+VERSION_KEY = 'obscene_version'
+STEM_MARK = '*'
+WORD_RE = re.compile(r'\w+')
+
+_lock = threading.Lock()
+_loaded = (None, None)
+
+
+class ObsceneMatcher:
+    """Словарь запрещенных слов. Слово со звездочкой на конце
+    («дура*») — основа: запрещены все слова, которые с нее начинаются."""
+
+    def __init__(self, words):
+        self.words = set()
+        self.stems = set()
+        for word in words:
+            word = word.strip().lower()
+            if word.endswith(STEM_MARK):
+                stem = word.rstrip(STEM_MARK)
+                if stem:
+                    self.stems.add(stem)
+            elif word:
+                self.words.add(word)
+        self.stem_lengths = sorted({len(stem) for stem in self.stems})
+
+    def __len__(self):
+        return len(self.words) + len(self.stems)
+
+    def is_obscene(self, word):
+        word = word.lower()
+        if word in self.words:
+            return True
+        for length in self.stem_lengths:
+            if length > len(word):
+                break
+            if word[:length] in self.stems:
+                return True
+        return False
+
+    def _replace(self, match):
+        word = match.group()
+        return '*' * len(word) if self.is_obscene(word) else word
+
+    def censor(self, text):
+        if not len(self):
+            return text
+        return WORD_RE.sub(self._replace, text)
+
+
+def current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = new_version()
+        if not cache.add(VERSION_KEY, version, None):
+            version = cache.get(VERSION_KEY, version)
+    return version
+
+
+def bump_version():
+    cache.set(VERSION_KEY, new_version(), None)
+
+
+def get_matcher():
+    global _loaded
+    version = current_version()
+    loaded_version, matcher = _loaded
+    if loaded_version == version:
+        return matcher
+    with _lock:
+        if _loaded[0] != version:
+            words = Obscene.objects.values_list('word', flat=True)
+            _loaded = (version, ObsceneMatcher(words.iterator()))
+        return _loaded[1]
@@ -0,0 +1,270 @@
+import base64
+import binascii
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db.models import Max, Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from django.utils.http import urlencode
+
+from core.singleflight import start_refresh
+
+CURSOR_SEPARATOR = '|'
+
+
+def encode_cursor(*values):
+    raw = CURSOR_SEPARATOR.join(str(value) for value in values)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, size=2):
+    padded = cursor + '=' * (-len(cursor) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+    except (binascii.Error, UnicodeError, ValueError):
+        return None
+    values = raw.split(CURSOR_SEPARATOR)
+    if len(values) != size:
+        return None
+    return values
+
+
+class CursorPage(Page):
+    """Страница keyset-пагинации: вместо номера страницы хранит
+    курсоры первой и последней записи."""
+
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        super().__init__(object_list, None, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return '<Cursor page of %s>' % len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def next_query(self):
+        if not self.has_next() or not self.object_list:
+            return ''
+        return self.paginator.cursor_query(self.object_list[-1], True)
+
+    def previous_query(self):
+        if not self.has_previous() or not self.object_list:
+            return ''
+        return self.paginator.cursor_query(self.object_list[0], False)
+
+
+class CursorPaginator(Paginator):
+    """Пагинатор с курсорами по ключу (pub_date, id): стоимость курсорной
+    страницы не зависит от глубины, COUNT(*) для нее не выполняется."""
+
+    ELLIPSIS = '…'
+
+    def __init__(self, object_list, per_page, ordering=('-pub_date', '-id'),
+                 lookups=None, count_list=None, total=None, **kwargs):
+        self.ordering = ordering
+        self.count_list = count_list
+        self.total = total
+        self.descending = ordering[0].startswith('-')
+        self.lookups = lookups or tuple(
+            field.lstrip('-') for field in ordering
+        )
+        super().__init__(
+            object_list.order_by(*ordering), per_page, **kwargs
+        )
+
+    def transform(self, rows):
+        return rows
+
+    def _get_page(self, object_list, number, paginator):
+        return super()._get_page(self.transform(object_list),
+                                 number, paginator)
+
+    @cached_property
+    def count(self):
+        if self.total is not None:
+            return self.total
+        if self.count_list is None:
+            return Paginator.count.func(self)
+        return self.count_list.count()
+
+    def get_elided_page_range(self, number=1, on_each_side=3, on_ends=2):
+        """Номера страниц вокруг текущей и по краям, пропуски заменены
+        на ELLIPSIS (как Paginator.get_elided_page_range в Django 3.2)."""
+        number = self.validate_number(number)
+        if self.num_pages <= (on_each_side + on_ends) * 2:
+            yield from self.page_range
+            return
+        if number > 1 + on_each_side + on_ends + 1:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < self.num_pages - on_each_side - on_ends - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(self.num_pages - on_ends + 1,
+                             self.num_pages + 1)
+        else:
+            yield from range(number + 1, self.num_pages + 1)
+
+    def cursor_values(self, obj):
+        return obj.pub_date.isoformat(), obj.pk
+
+    def cursor_query(self, obj, forward):
+        param = 'before' if forward == self.descending else 'after'
+        return urlencode({param: encode_cursor(*self.cursor_values(obj))})
+
+    def _parse(self, cursor):
+        values = decode_cursor(cursor) if cursor else None
+        if values is None:
+            return None
+        pub_date = parse_datetime(values[0])
+        if pub_date is None or not values[1].isdigit():
+            return None
+        return pub_date, int(values[1])
+
+    def _seek(self, values, lookup):
+        date_field, id_field = self.lookups
+        pub_date, pk = values
+        return (Q(**{f'{date_field}__{lookup}': pub_date})
+                | Q(**{date_field: pub_date, f'{id_field}__{lookup}': pk}))
+
+    def seek(self, queryset, values, lookup):
+        return queryset.filter(self._seek(values, lookup))
+
+    def get_cursor_page(self, before=None, after=None):
+        before_values = self._parse(before)
+        after_values = self._parse(after)
+        queryset = self.object_list
+        if before_values is not None:
+            queryset = self.seek(queryset, before_values, 'lt')
+        elif after_values is not None:
+            queryset = self.seek(queryset, after_values, 'gt')
+        cursor = before_values or after_values
+        backwards = cursor is not None and (
+            (before_values is None) == self.descending
+        )
+        if backwards:
+            queryset = queryset.reverse()
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = list(self.transform(rows[:self.per_page]))
+        if backwards:
+            rows.reverse()
+            return CursorPage(rows, self, True, has_more)
+        return CursorPage(rows, self, has_more, cursor is not None)
+
+
+class CachedCountPaginator(CursorPaginator):
+    """Курсорный пагинатор, который хранит число записей в кэше под
+    ключом ленты count_key вместе с ее версией count_version.
+
+    Пока версия совпадает, COUNT(*) не выполняется. Иначе небольшая
+    выборка пересчитывается сразу запросом с LIMIT, а для огромной
+    отдается прежнее число или оценка, и точный COUNT(*) считает
+    фоновый поток.
+    """
+
+    def __init__(self, object_list, per_page, count_key=None,
+                 count_version=None, **kwargs):
+        self.count_key = count_key
+        self.count_version = count_version
+        super().__init__(object_list, per_page, **kwargs)
+
+    def count_queryset(self):
+        if self.count_list is None:
+            return self.object_list.order_by()
+        return self.count_list.order_by()
+
+    @cached_property
+    def count(self):
+        if self.total is not None or self.count_key is None:
+            return CursorPaginator.count.func(self)
+        entry = cache.get(self.count_key)
+        if entry is not None and entry['version'] == self.count_version:
+            return entry['value']
+        limit = settings.COUNT_ESTIMATE_THRESHOLD
+        if entry is None or entry['value'] <= limit:
+            count = self.count_queryset()[:limit + 1].count()
+            if count <= limit:
+                self.store_count(count)
+                return count
+            estimate = self.estimate_count(count)
+        else:
+            estimate = entry['value']
+        lock_key = f'{self.count_key}:lock'
+        if cache.add(lock_key, 1, settings.COUNT_LOCK_TIMEOUT):
+            start_refresh(lambda: self.refresh_count(lock_key))
+        return estimate
+
+    def estimate_count(self, lower_bound):
+        """Оценка без полного прохода: для ленты без фильтра — наибольший
+        первичный ключ таблицы, иначе нижняя граница."""
+        queryset = self.count_queryset()
+        if queryset.query.where:
+            return lower_bound
+        last_pk = queryset.model.objects.aggregate(last=Max('pk'))['last']
+        return max(lower_bound, last_pk or 0)
+
+    def store_count(self, count):
+        cache.set(self.count_key,
+                  {'value': count, 'version': self.count_version},
+                  settings.COUNT_CACHE_TIMEOUT)
+
+    def refresh_count(self, lock_key):
+        try:
+            self.store_count(self.count_queryset().count())
+        finally:
+            cache.delete(lock_key)
+
+
+class SearchPaginator(CursorPaginator):
+    """Курсорная пагинация результатов поиска по ключу (search_rank, id).
+    Условие продолжения строит поисковый бэкенд."""
+
+    def __init__(self, object_list, per_page, backend, **kwargs):
+        self.backend = backend
+        super().__init__(object_list, per_page,
+                         ordering=('search_rank', 'id'), **kwargs)
+
+    def cursor_values(self, obj):
+        return repr(obj.search_rank), obj.pk
+
+    def _parse(self, cursor):
+        values = decode_cursor(cursor) if cursor else None
+        if values is None or not values[1].isdigit():
+            return None
+        try:
+            rank = float(values[0])
+        except ValueError:
+            return None
+        return rank, int(values[1])
+
+    def seek(self, queryset, values, lookup):
+        return self.backend.seek(queryset, *values, lookup)
+
+
+def dump_page(page):
+    if getattr(page, 'is_cursor', False):
+        return ('cursor', list(page.object_list),
+                page.has_next(), page.has_previous())
+    return 'page', list(page.object_list), page.number, page.paginator.count
+
+
+def load_page(value, paginator):
+    kind, rows, *rest = value
+    if kind == 'cursor':
+        return CursorPage(rows, paginator, *rest)
+    number, count = rest
+    paginator.total = count
+    return Page(rows, number, paginator)
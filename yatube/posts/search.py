@@ -0,0 +1,158 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import FloatField, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Substr
+from django.utils.module_loading import import_string
+
+FTS_TABLE = 'posts_post_fts'
+FTS_CREATE = (
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5('
+    "text, tokenize='unicode61 remove_diacritics 2')"
+)
+FTS_FILL = (f'INSERT INTO {FTS_TABLE} (rowid, text) '
+            'SELECT id, text FROM posts_post')
+
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_END = '\x03'
+SNIPPET_WORDS = 16
+SNIPPET_LENGTH = 200
+MAX_TERMS = 10
+TERM_RE = re.compile(r'\w+')
+
+
+def search_terms(query):
+    return TERM_RE.findall(query.lower())[:MAX_TERMS]
+
+
+class SearchBackend:
+    """Интерфейс поиска по постам.
+
+    search() возвращает queryset постов с полями search_rank (меньше —
+    релевантнее) и search_snippet; порядок — по (search_rank, id).
+    """
+
+    def index(self, post):
+        raise NotImplementedError
+
+    def remove(self, post_id):
+        raise NotImplementedError
+
+    def rebuild(self):
+        raise NotImplementedError
+
+    def filter(self, queryset, query):
+        raise NotImplementedError
+
+    def search(self, queryset, query):
+        raise NotImplementedError
+
+    def seek(self, queryset, rank, pk, lookup):
+        raise NotImplementedError
+
+
+class LikeSearchBackend(SearchBackend):
+    """Поиск через LIKE без ранжирования: для баз без FTS5."""
+
+    def index(self, post):
+        pass
+
+    def remove(self, post_id):
+        pass
+
+    def rebuild(self):
+        return 0
+
+    def filter(self, queryset, query):
+        terms = search_terms(query)
+        if not terms:
+            return queryset.none()
+        for term in terms:
+            queryset = queryset.filter(text__icontains=term)
+        return queryset
+
+    def search(self, queryset, query):
+        return self.filter(queryset, query).annotate(
+            search_rank=Value(0.0, output_field=FloatField()),
+            search_snippet=Substr('text', 1, SNIPPET_LENGTH),
+        )
+
+    def seek(self, queryset, rank, pk, lookup):
+        return queryset.filter(**{f'id__{lookup}': pk})
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """Поиск по виртуальной таблице FTS5 с ранжированием bm25."""
+
+    def match_expression(self, query):
+        terms = search_terms(query)
+        if not terms:
+            return None
+        quoted = [f'"{term}"' for term in terms]
+        quoted[-1] += '*'
+        return ' '.join(quoted)
+
+    def index(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                           [post.pk])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+                [post.pk, post.text]
+            )
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                           [post_id])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(FTS_FILL)
+            count = cursor.rowcount
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')"
+            )
+        return count
+
+    def filter(self, queryset, query):
+        match = self.match_expression(query)
+        if match is None:
+            return queryset.none()
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            [match]
+        ))
+
+    def search(self, queryset, query):
+        match = self.match_expression(query)
+        if match is None:
+            return queryset.extra(select={
+                'search_rank': '0.0', 'search_snippet': "''"
+            }).none()
+        return queryset.extra(
+            select={
+                'search_rank': f'{FTS_TABLE}.rank',
+                'search_snippet': f"snippet({FTS_TABLE}, 0, %s, %s, '…', "
+                                  f'{SNIPPET_WORDS})',
+            },
+            select_params=(HIGHLIGHT_START, HIGHLIGHT_END),
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE}.rowid = posts_post.id',
+                   f'{FTS_TABLE} MATCH %s'],
+            params=[match],
+        )
+
+    def seek(self, queryset, rank, pk, lookup):
+        operator = '<' if lookup == 'lt' else '>'
+        condition = (f'({FTS_TABLE}.rank {operator} %s OR '
+                     f'({FTS_TABLE}.rank = %s AND '
+                     f'posts_post.id {operator} %s))')
+        return queryset.extra(where=[condition], params=[rank, rank, pk])
+
+
+def search_backend():
+    return import_string(settings.SEARCH_BACKEND)()
@@ -0,0 +1,398 @@
+import hashlib
+import heapq
+from collections import defaultdict
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
+from django.db.models import Q
+from django.db.models.deletion import Collector
+
+from .models import Comment, Post, ShardedId, TimelineEntry
+
+SHARDED_MODELS = ('posts.post', 'posts.comment')
+SHARD_TABLES = (*SHARDED_MODELS, 'posts.shardedid')
+
+_reserved = set()
+
+
+def is_sharded():
+    return bool(settings.POST_SHARDS)
+
+
+def shard_for_author(author_id, shards=None):
+    """Шард автора по rendezvous-хэшированию: при добавлении шарда
+    переезжает только доля авторов, которая достанется новому."""
+    shards = shards or settings.POST_SHARDS
+    return max(shards, key=lambda alias: hashlib.md5(
+        f'{alias}:{author_id}'.encode()
+    ).hexdigest())
+
+
+def location_key(post_id):
+    return f'post_shard:{post_id}'
+
+
+def find_post_shard(post_id):
+    """Шард, где лежит пост: по запросу к шардам по первичному ключу,
+    найденное место запоминается в кэше."""
+    alias = cache.get(location_key(post_id))
+    if alias in settings.POST_SHARDS:
+        return alias
+    for alias in settings.POST_SHARDS:
+        if Post.objects.using(alias).filter(pk=post_id).exists():
+            cache.set(location_key(post_id), alias,
+                      settings.POST_SHARD_CACHE_TIMEOUT)
+            return alias
+    return None
+
+
+def instance_shard(instance):
+    if not instance._state.adding:
+        return instance._state.db
+    if isinstance(instance, Post):
+        return shard_for_author(instance.author_id)
+    post_field = Comment._meta.get_field('post')
+    if post_field.is_cached(instance):
+        return instance_shard(instance.post)
+    return find_post_shard(instance.post_id)
+
+
+class ShardRouter:
+    """Посты и комментарии при заданном POST_SHARDS живут в шарде автора
+    поста. Роутер решает только для запросов с подсказкой-объектом:
+    ленты сами обращаются к шардам через using()."""
+
+    def shard_for(self, model, hints):
+        if (not is_sharded()
+                or model._meta.label_lower not in SHARDED_MODELS):
+            return None
+        instance = hints.get('instance')
+        if isinstance(instance, (Post, Comment)):
+            return instance_shard(instance)
+        if model is Post and instance is not None:
+            if instance._meta.label_lower == settings.AUTH_USER_MODEL.lower():
+                return shard_for_author(instance.pk)
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self.shard_for(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self.shard_for(model, hints)
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == DEFAULT_DB_ALIAS or db not in settings.POST_SHARDS:
+            return None
+        return f'{app_label}.{model_name}' in SHARD_TABLES
+
+
+def last_id(alias):
+    return max(
+        model.objects.using(alias).order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0
+        for model in (Post, Comment)
+    )
+
+
+def shard_number(alias):
+    return settings.POST_SHARDS.index(alias)
+
+
+def reserve_ids(last_id, aliases=None):
+    """Сдвигает последовательности шардов так, чтобы они выдавали id
+    больше last_id: AUTOINCREMENT в SQLite не выдает номер меньше
+    самого большого из когда-либо вставленных."""
+    number = last_id // settings.POST_SHARD_ID_STRIDE
+    if not number:
+        return
+    for alias in aliases or settings.POST_SHARDS:
+        with transaction.atomic(using=alias):
+            ShardedId.objects.using(alias).create(pk=number)
+            ShardedId.objects.using(alias).filter(pk=number).delete()
+
+
+def allocate_id(alias):
+    """Новый id поста или комментария в шарде alias: номер из
+    последовательности самого шарда, умноженный на
+    POST_SHARD_ID_STRIDE, плюс номер шарда. Шарды выдают id
+    из непересекающихся классов и не пишут в общую базу, а строки
+    переезжают между шардами с теми же id. Первый вызов в процессе
+    сдвигает последовательность за id, которые основная база выдала
+    до включения шардов."""
+    if alias not in _reserved:
+        reserve_ids(last_id(DEFAULT_DB_ALIAS), [alias])
+        _reserved.add(alias)
+    with transaction.atomic(using=alias):
+        number = ShardedId.objects.using(alias).create().pk
+        ShardedId.objects.using(alias).filter(pk=number).delete()
+    return number * settings.POST_SHARD_ID_STRIDE + shard_number(alias)
+
+
+def delete_author_rows(author_id):
+    """Каскад удаления пользователя в шардах: внешние ключи туда
+    не доходят, поэтому его посты и комментарии удаляются здесь.
+    Посты удаляются без сбора связанных строк: записей ленты в шардах
+    нет, а комментарии к постам уже удалены."""
+    for alias in settings.POST_SHARDS:
+        Comment.objects.using(alias).filter(
+            Q(author_id=author_id) | Q(post__author_id=author_id)
+        ).delete()
+        collector = Collector(using=alias)
+        collector.collect(
+            list(Post.objects.using(alias).filter(author_id=author_id)),
+            collect_related=False
+        )
+        collector.delete()
+
+
+def detach_group(group_id):
+    """SET NULL для постов удаляемой группы во всех шардах."""
+    for alias in settings.POST_SHARDS:
+        Post.objects.using(alias).filter(group_id=group_id).update(
+            group=None
+        )
+
+
+def related(queryset, *fields):
+    """select_related в одной базе. В шардах нет таблиц авторов и групп,
+    поэтому там связанные объекты подгружаются prefetch_related."""
+    if is_sharded():
+        return queryset.prefetch_related(*fields)
+    return queryset.select_related(*fields)
+
+
+def each_shard(queryset):
+    if not is_sharded():
+        return [queryset]
+    return [queryset.using(alias) for alias in settings.POST_SHARDS]
+
+
+def scatter(queryset):
+    """Запрос сразу ко всем шардам; без шардирования — сам queryset."""
+    if not is_sharded():
+        return queryset
+    return ShardedQuerySet(each_shard(queryset))
+
+
+def author_posts(queryset, author_ids):
+    """Посты авторов author_ids: по запросу только к тем шардам,
+    где эти авторы лежат."""
+    author_ids = list(author_ids)
+    if not is_sharded():
+        return queryset.filter(author_id__in=author_ids)
+    shards = defaultdict(list)
+    for author_id in author_ids:
+        shards[shard_for_author(author_id)].append(author_id)
+    return ShardedQuerySet([
+        queryset.using(alias).filter(author_id__in=ids)
+        for alias, ids in shards.items()
+    ] or [queryset.none()])
+
+
+def post_queryset(post_id):
+    """Посты той базы, где лежит пост post_id."""
+    if not is_sharded():
+        return Post.objects.all()
+    alias = find_post_shard(post_id)
+    if alias is None:
+        return Post.objects.none()
+    return Post.objects.using(alias)
+
+
+class ShardedQuery:
+    def __init__(self, querysets):
+        self.queries = [(queryset.db, queryset.query)
+                        for queryset in querysets]
+        self.where = next(
+            (query.where for _, query in self.queries if query.where),
+            self.queries[0][1].where
+        )
+
+    def __str__(self):
+        return ' | '.join(f'{alias}: {query}'
+                          for alias, query in self.queries)
+
+
+class ShardedQuerySet:
+    """Один упорядоченный queryset поверх запросов к нескольким шардам.
+
+    Срез [low:high] берет из каждого шарда первые high строк и сливает
+    их k-way слиянием по полям сортировки, поэтому с ним работают
+    CursorPaginator и CachedCountPaginator. Поля сортировки должны
+    идти в одном направлении.
+    """
+
+    def __init__(self, querysets, ordering=None, low=0, high=None):
+        self.querysets = querysets
+        self.model = querysets[0].model
+        if ordering is None:
+            ordering = (querysets[0].query.order_by
+                        or self.model._meta.ordering)
+        self.ordering = tuple(ordering)
+        self.low = low
+        self.high = high
+        self._result_cache = None
+
+    @property
+    def query(self):
+        return ShardedQuery(self.querysets)
+
+    @property
+    def ordered(self):
+        return bool(self.ordering)
+
+    def _chain(self, method, *args, **kwargs):
+        return ShardedQuerySet(
+            [getattr(queryset, method)(*args, **kwargs)
+             for queryset in self.querysets],
+            self.ordering
+        )
+
+    def all(self):
+        return self._chain('all')
+
+    def none(self):
+        return self._chain('none')
+
+    def filter(self, *args, **kwargs):
+        return self._chain('filter', *args, **kwargs)
+
+    def exclude(self, *args, **kwargs):
+        return self._chain('exclude', *args, **kwargs)
+
+    def annotate(self, *args, **kwargs):
+        return self._chain('annotate', *args, **kwargs)
+
+    def values(self, *fields, **expressions):
+        return self._chain('values', *fields, **expressions)
+
+    def select_related(self, *fields):
+        return self._chain('select_related', *fields)
+
+    def prefetch_related(self, *lookups):
+        return self._chain('prefetch_related', *lookups)
+
+    def only(self, *fields):
+        return self._chain('only', *fields)
+
+    def order_by(self, *ordering):
+        return ShardedQuerySet(
+            [queryset.order_by(*ordering) for queryset in self.querysets],
+            ordering
+        )
+
+    def reverse(self):
+        return ShardedQuerySet(
+            [queryset.reverse() for queryset in self.querysets],
+            tuple(field[1:] if field.startswith('-') else '-' + field
+                  for field in self.ordering)
+        )
+
+    def in_bulk(self, id_list=None, *, field_name='pk'):
+        found = {}
+        for queryset in self.querysets:
+            found.update(queryset.in_bulk(id_list, field_name=field_name))
+        return found
+
+    def count(self):
+        if self.high is None:
+            return sum(queryset.count() for queryset in self.querysets)
+        total = sum(queryset[:self.high].count()
+                    for queryset in self.querysets)
+        return max(min(total, self.high) - self.low, 0)
+
+    def sort_key(self, row):
+        fields = [field.lstrip('-') for field in self.ordering]
+        if isinstance(row, dict):
+            return tuple(row[field] for field in fields)
+        return tuple(getattr(row, field) for field in fields)
+
+    def _fetch_all(self):
+        if self._result_cache is not None:
+            return self._result_cache
+        if self.high is None:
+            parts = [list(queryset) for queryset in self.querysets]
+        else:
+            parts = [list(queryset[:self.high])
+                     for queryset in self.querysets]
+        descending = bool(self.ordering) and self.ordering[0].startswith('-')
+        merged = heapq.merge(*parts, key=self.sort_key, reverse=descending)
+        self._result_cache = list(islice(merged, self.low, self.high))
+        return self._result_cache
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self._fetch_all()[index]
+        if index.step is not None or self.low or self.high is not None:
+            return self._fetch_all()[index]
+        return ShardedQuerySet(self.querysets, self.ordering,
+                               index.start or 0, index.stop)
+
+    def __iter__(self):
+        return iter(self._fetch_all())
+
+    def __len__(self):
+        return len(self._fetch_all())
+
+    def __bool__(self):
+        return bool(self._fetch_all())
+
+
+def move_posts(source, target, post_ids):
+    """Копирует посты с комментариями из source в target с теми же id
+    и удаляет их в source. Строки, уже скопированные прерванным
+    запуском, повторно не вставляются."""
+    posts = list(Post.objects.using(source).filter(pk__in=post_ids))
+    comments = list(Comment.objects.using(source).filter(
+        post_id__in=post_ids
+    ))
+    with transaction.atomic(using=target):
+        for model, rows in ((Post, posts), (Comment, comments)):
+            present = set(model.objects.using(target).filter(
+                pk__in=[row.pk for row in rows]
+            ).values_list('pk', flat=True))
+            model.objects.using(target).bulk_create(
+                [row for row in rows if row.pk not in present]
+            )
+    models = [Comment, Post]
+    if router.allow_migrate_model(source, TimelineEntry):
+        models.insert(0, TimelineEntry)
+    with transaction.atomic(using=source):
+        with connections[source].cursor() as cursor:
+            placeholders = ', '.join(['%s'] * len(post_ids))
+            for model in models:
+                column = 'id' if model is Post else 'post_id'
+                cursor.execute(
+                    f'DELETE FROM {model._meta.db_table} '
+                    f'WHERE {column} IN ({placeholders})', post_ids
+                )
+    cache.delete_many([location_key(post_id) for post_id in post_ids])
+
+
+def rebalance(batch_size=500):
+    """Переносит посты и комментарии туда, где им место по POST_SHARDS;
+    источники — шарды и основная база. Возвращает {(откуда, куда):
+    число постов}."""
+    sources = list(dict.fromkeys([DEFAULT_DB_ALIAS,
+                                  *settings.POST_SHARDS]))
+    reserve_ids(max(last_id(alias) for alias in sources))
+    moved = defaultdict(int)
+    for source in sources:
+        author_ids = Post.objects.using(source).order_by().values_list(
+            'author_id', flat=True
+        ).distinct()
+        for author_id in list(author_ids):
+            target = shard_for_author(author_id)
+            if target == source:
+                continue
+            post_ids = list(Post.objects.using(source).filter(
+                author_id=author_id
+            ).order_by('pk').values_list('pk', flat=True))
+            for start in range(0, len(post_ids), batch_size):
+                batch = post_ids[start:start + batch_size]
+                move_posts(source, target, batch)
+                moved[source, target] += len(batch)
+    return dict(moved)
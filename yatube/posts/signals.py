@@ -0,0 +1,185 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import obscene, search, sharding, thumbnails, timeline
+from .feed_cache import (INDEX, GROUPS, bump_feed_versions,
+                         card_group_scope, card_post_scope, card_user_scope,
+                         comments_scope, group_scope, post_scope,
+                         profile_scope)
+from .models import Comment, Follow, Group, Obscene, Post
+from .stats import change_author_stats, change_comments_count
+
+User = get_user_model()
+
+
+@receiver(pre_save, sender=Post)
+def post_remember_group(sender, instance, raw=False, using=None, **kwargs):
+    instance._saved_group_id = None
+    instance._saved_image = None
+    if instance.pk and not raw:
+        row = Post.objects.using(using).filter(pk=instance.pk).values_list(
+            'group_id', 'image', 'comments_count'
+        ).first()
+        if row is not None:
+            instance._saved_group_id, instance._saved_image = row[:2]
+            instance.comments_count = row[2]
+
+
+@receiver(pre_save, sender=Post)
+@receiver(pre_save, sender=Comment)
+def sharded_allocate_id(sender, instance, raw=False, using=None, **kwargs):
+    if (instance.pk is None and not raw
+            and using in settings.POST_SHARDS):
+        instance.pk = sharding.allocate_id(using)
+
+
+@receiver(pre_delete, sender=User)
+def user_delete_sharded(sender, instance, **kwargs):
+    sharding.delete_author_rows(instance.pk)
+
+
+@receiver(pre_delete, sender=Group)
+def group_detach_sharded(sender, instance, **kwargs):
+    sharding.detach_group(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_bump_feeds(sender, instance, **kwargs):
+    group_ids = {instance.group_id, getattr(instance, '_saved_group_id',
+                                            None)}
+    bump_feed_versions(
+        INDEX,
+        profile_scope(instance.author_id),
+        post_scope(instance.pk),
+        card_post_scope(instance.pk),
+        *(group_scope(group_id) for group_id in group_ids if group_id)
+    )
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_bump_feeds(sender, instance, **kwargs):
+    bump_feed_versions(INDEX, GROUPS, group_scope(instance.pk),
+                       card_group_scope(instance.pk))
+
+
+@receiver(post_save, sender=User)
+def user_bump_feeds(sender, instance, created, update_fields=None,
+                    **kwargs):
+    if created or update_fields and set(update_fields) <= {'last_login'}:
+        return
+    group_ids = instance.posts.exclude(group=None).order_by().values_list(
+        'group_id', flat=True
+    ).distinct()
+    bump_feed_versions(INDEX, profile_scope(instance.pk),
+                       card_user_scope(instance.pk),
+                       *(group_scope(group_id) for group_id in group_ids))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_bump_post(sender, instance, using=None, **kwargs):
+    scopes = [post_scope(instance.post_id)]
+    if Comment._meta.get_field('post').is_cached(instance):
+        row = instance.post.author_id, instance.post.group_id
+    else:
+        row = Post.objects.using(using).filter(
+            pk=instance.post_id
+        ).values_list('author_id', 'group_id').first()
+    if row is not None:
+        author_id, group_id = row
+        scopes += [comments_scope(INDEX),
+                   comments_scope(profile_scope(author_id))]
+        if group_id:
+            scopes.append(comments_scope(group_scope(group_id)))
+    bump_feed_versions(*scopes)
+
+
+@receiver(post_save, sender=Comment)
+def comment_count_post(sender, instance, created, raw=False, using=None,
+                       **kwargs):
+    if created and not raw:
+        change_comments_count(instance.post_id, 1, using)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_uncount_post(sender, instance, using=None, **kwargs):
+    change_comments_count(instance.post_id, -1, using)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def follow_bump_profiles(sender, instance, **kwargs):
+    bump_feed_versions(profile_scope(instance.author_id),
+                       profile_scope(instance.user_id))
+
+
+@receiver(post_save, sender=Post)
+def post_fan_out(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and settings.TIMELINE_ENABLED:
+        timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def follow_fill_timeline(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and settings.TIMELINE_ENABLED:
+        timeline.follow_author(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def unfollow_clean_timeline(sender, instance, **kwargs):
+    if settings.TIMELINE_ENABLED:
+        timeline.unfollow_author(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+def post_count_author_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        change_author_stats(instance.author_id, posts_count=1)
+
+
+@receiver(post_delete, sender=Post)
+def post_uncount_author_stats(sender, instance, **kwargs):
+    change_author_stats(instance.author_id, posts_count=-1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_count_author_stats(sender, instance, created, raw=False,
+                              **kwargs):
+    if created and not raw:
+        change_author_stats(instance.author_id, followers_count=1)
+        change_author_stats(instance.user_id, following_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_uncount_author_stats(sender, instance, **kwargs):
+    change_author_stats(instance.author_id, followers_count=-1)
+    change_author_stats(instance.user_id, following_count=-1)
+
+
+@receiver(post_save, sender=Obscene)
+@receiver(post_delete, sender=Obscene)
+def obscene_reload_matcher(sender, **kwargs):
+    obscene.bump_version()
+
+
+@receiver(post_save, sender=Post)
+def post_schedule_thumbnails(sender, instance, raw=False, **kwargs):
+    if not raw and instance.image.name != getattr(instance, '_saved_image',
+                                                  None):
+        thumbnails.schedule_thumbnails(instance)
+
+
+@receiver(post_save, sender=Post)
+def post_index_search(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.search_backend().index(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_unindex_search(sender, instance, **kwargs):
+    search.search_backend().remove(instance.pk)
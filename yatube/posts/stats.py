@@ -0,0 +1,86 @@
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import AuthorStats, Comment, Follow, Post
+from .sharding import author_posts, each_shard
+
+User = get_user_model()
+
+
+def count_author_stats(author_id):
+    return {
+        'posts_count': author_posts(Post.objects.all(),
+                                    [author_id]).count(),
+        'followers_count': Follow.objects.filter(
+            author_id=author_id
+        ).count(),
+        'following_count': Follow.objects.filter(user_id=author_id).count(),
+    }
+
+
+def get_author_stats(author):
+    try:
+        return author.stats
+    except AuthorStats.DoesNotExist:
+        stats, _ = AuthorStats.objects.get_or_create(
+            author=author,
+            defaults=count_author_stats(author.pk)
+        )
+        author.stats = stats
+        return stats
+
+
+def change_author_stats(author_id, **deltas):
+    floors = {f'{field}__gte': -delta
+              for field, delta in deltas.items() if delta < 0}
+    AuthorStats.objects.filter(author_id=author_id, **floors).update(**{
+        field: F(field) + delta for field, delta in deltas.items()
+    })
+
+
+def change_comments_count(post_id, delta, using=None):
+    floor = {'comments_count__gte': -delta} if delta < 0 else {}
+    Post.objects.using(using).filter(pk=post_id, **floor).update(
+        comments_count=F('comments_count') + delta
+    )
+
+
+def rebuild_comments_count():
+    counts = Comment.objects.filter(post=OuterRef('pk')).order_by().values(
+        'post'
+    ).annotate(total=Count('id')).values('total')
+    return sum(
+        queryset.update(comments_count=Coalesce(Subquery(counts), 0))
+        for queryset in each_shard(Post.objects.all())
+    )
+
+
+def grouped_counts(queryset, field):
+    return dict(
+        queryset.order_by().values(field).annotate(
+            total=Count('id')
+        ).values_list(field, 'total')
+    )
+
+
+@transaction.atomic
+def rebuild_author_stats():
+    posts = Counter()
+    for queryset in each_shard(Post.objects.all()):
+        posts.update(grouped_counts(queryset, 'author'))
+    followers = grouped_counts(Follow.objects.all(), 'author')
+    following = grouped_counts(Follow.objects.all(), 'user')
+    AuthorStats.objects.all().delete()
+    AuthorStats.objects.bulk_create(
+        (AuthorStats(author_id=author_id,
+                     posts_count=posts.get(author_id, 0),
+                     followers_count=followers.get(author_id, 0),
+                     following_count=following.get(author_id, 0))
+         for author_id in User.objects.values_list('id', flat=True)
+         .iterator())
+    )
+    return AuthorStats.objects.count()
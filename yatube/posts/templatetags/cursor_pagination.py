@@ -0,0 +1,15 @@
+from django import template
+
+register = template.Library()
+
+
+@register.filter
+def next_cursor_query(page_obj):
+    if not page_obj.has_next() or not page_obj.object_list:
+        return ''
+    return page_obj.paginator.cursor_query(page_obj[-1], True)
+
+
+@register.filter
+def elided_page_range(page_obj):
+    return page_obj.paginator.get_elided_page_range(page_obj.number)
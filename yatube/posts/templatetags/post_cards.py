@@ -0,0 +1,11 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from ..cards import render_cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(page_obj, **options):
+    return [mark_safe(card) for card in render_cards(page_obj, **options)]
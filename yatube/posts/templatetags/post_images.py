@@ -0,0 +1,17 @@
+from django import template
+
+from ..thumbnails import cached_thumbnail
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail(post, geometry):
+    if not post.image:
+        return None
+    thumbnails = getattr(post, 'thumbnails', None)
+    if thumbnails is None:
+        thumbnail = cached_thumbnail(post.image, geometry)
+    else:
+        thumbnail = thumbnails.get(geometry)
+    return thumbnail or post.image
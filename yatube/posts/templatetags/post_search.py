@@ -0,0 +1,15 @@
+from django import template
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from ..search import HIGHLIGHT_END, HIGHLIGHT_START
+
+register = template.Library()
+
+
+@register.filter
+def highlight(snippet):
+    return mark_safe(
+        escape(snippet).replace(HIGHLIGHT_START, '<mark>')
+        .replace(HIGHLIGHT_END, '</mark>')
+    )
@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import models
+from django.test import TestCase
+from django.utils import timezone
+
+from ..management.commands import generate_load_data
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class GenerateLoadDataTests(TestCase):
+    def test_generate_load_data(self):
+        """Проверяем, что generate_load_data создает заданное число
+        записей с согласованными счетчиками и без подписок на себя."""
+
+        call_command('generate_load_data', users=30, groups=3, posts=200,
+                     comments=300, follows_per_user=5, batch_size=70,
+                     workers=0, stdout=StringIO())
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 300)
+        self.assertFalse(Follow.objects.filter(
+            user_id=models.F('author_id')
+        ).exists())
+        post = Post.objects.order_by('-comments_count').first()
+        self.assertEqual(post.comments_count, post.comments.count())
+        author = User.objects.order_by('-stats__posts_count').first()
+        self.assertEqual(author.stats.posts_count, author.posts.count())
+        self.assertGreater(author.stats.posts_count, 200 / 30,
+                           'Авторы выбираются по степенному закону')
+
+    def test_dates_do_not_depend_on_now(self):
+        """Проверяем, что даты записей задаются --start и --days,
+        а не временем запуска."""
+
+        call_command('generate_load_data', '--start=2020-03-01',
+                     users=5, groups=1, posts=20, comments=20,
+                     follows_per_user=2, days=10, workers=0,
+                     stdout=StringIO())
+        start = datetime(2020, 3, 1, tzinfo=timezone.utc)
+        end = start + timedelta(days=10)
+        self.assertEqual(set(User.objects.values_list('date_joined',
+                                                      flat=True)),
+                         {start})
+        for model in (Post, Comment):
+            dates = model.objects.aggregate(first=models.Min('pub_date'),
+                                            last=models.Max('pub_date'))
+            self.assertGreaterEqual(dates['first'], start)
+            self.assertLessEqual(dates['last'], end)
+        self.assertEqual(
+            Post.objects.aggregate(last=models.Max('updated'))['last'],
+            Post.objects.aggregate(last=models.Max('pub_date'))['last']
+        )
+        with self.assertRaises(CommandError):
+            call_command('generate_load_data', '--start=вчера',
+                         stdout=StringIO())
+
+    def test_chunks_are_deterministic(self):
+        """Проверяем, что пачка строк зависит только от seed и номера."""
+
+        now = timezone.now()
+        params = {
+            'seed': 7, 'locale': 'ru_RU', 'users': 50, 'groups': 5,
+            'posts': 100, 'exponent': 1.1, 'group_share': 0.7,
+            'first_user_id': 1, 'first_group_id': 1, 'first_post_id': 1,
+            'start': now - timedelta(days=1), 'end': now,
+            'span': timedelta(days=1),
+        }
+        first = generate_load_data.post_rows(params, 1, 50, 100)
+        second = generate_load_data.post_rows(params, 1, 50, 100)
+        self.assertEqual(first, second)
+        self.assertNotEqual(
+            first, generate_load_data.post_rows(dict(params, seed=8),
+                                                1, 50, 100)
+        )
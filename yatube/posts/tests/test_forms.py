@@ -8,8 +8,9 @@ from django.urls import reverse
 from django.utils import timezone
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.conf import settings
+from django.core.cache import cache
 
-from ..models import Group, Post
+from ..models import Group, Obscene, Post
 from ..forms import PostForm, CommentForm
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -391,6 +392,40 @@ class PostFormTests(TestCase):
                         'У поста должна отсутствовать картинка'
                     )
 
+    def test_post_fragment_responses(self):
+        """Проверяем, что запросы из скриптов получают карточку поста
+        или ошибки формы вместо редиректа."""
+
+        response = self.authorized_client.post(
+            reverse('posts:post_create'), data={'text': 'Пост из скрипта'},
+            HTTP_ACCEPT='application/json'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        post = Post.objects.get(pk=response.json()['id'])
+        self.assertEqual(response.json()['url'],
+                         reverse('posts:post_detail', args=[post.pk]))
+        self.assertIn('Пост из скрипта', response.json()['html'])
+        edit_url = reverse('posts:post_edit', args=[post.pk])
+        response = self.authorized_client.post(
+            edit_url, data={'text': 'Исправленный пост'},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertContains(response, 'Исправленный пост')
+        self.assertNotContains(response, '<html')
+        response = self.authorized_client.post(
+            edit_url, data={'text': ''}, HTTP_ACCEPT='application/json'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertIn('text', response.json()['errors'])
+        response = self.another_client.post(
+            edit_url, data={'text': 'Чужая правка'},
+            HTTP_ACCEPT='application/json'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+        post.refresh_from_db()
+        self.assertEqual(post.text, 'Исправленный пост')
+
 
 class CommentFormTest(TestCase):
     @classmethod
@@ -409,6 +444,7 @@ class CommentFormTest(TestCase):
         cls.form = CommentForm()
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.authorized_client = Client()
         self.authorized_client.force_login(CommentFormTest.user)
@@ -458,3 +494,51 @@ class CommentFormTest(TestCase):
         self.assertEqual(CommentFormTest.post.comments.count(),
                          count + 1,
                          'Количество комментариев должно увеличиться на 1')
+
+    def test_comment_obscene_words(self):
+        """Проверяем, что запрещенные слова и слова с запрещенной основой
+        заменяются звездочками, в том числе рядом со знаками препинания."""
+
+        Obscene.objects.create(word='дурак')
+        Obscene.objects.create(word='гад*')
+        self.authorized_client.post(
+            CommentFormTest.url,
+            data={'text': 'Ты  Дурак, гадина!\nНе гладь.'}
+        )
+        self.assertEqual(CommentFormTest.post.comments.last().text,
+                         'Ты *****, ******! Не гладь.')
+
+    def test_comment_obscene_matcher_reload(self):
+        """Проверяем, что словарь не читается из базы на каждый комментарий
+        и перестраивается после изменения списка слов."""
+
+        CommentForm(data={'text': 'разогрев'}).is_valid()
+        with self.assertNumQueries(0):
+            form = CommentForm(data={'text': 'редиска'})
+            form.is_valid()
+        self.assertEqual(form.cleaned_data['text'], 'редиска')
+        Obscene.objects.create(word='редиска')
+        form = CommentForm(data={'text': 'редиска'})
+        form.is_valid()
+        self.assertEqual(form.cleaned_data['text'], '*******')
+
+    def test_comment_fragment_responses(self):
+        """Проверяем, что AJAX-запрос получает только новый комментарий,
+        а JSON-запрос с пустым текстом — ошибки формы."""
+
+        response = self.authorized_client.post(
+            CommentFormTest.url, data={'text': 'Комментарий из скрипта'},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        self.assertContains(response, 'Комментарий из скрипта',
+                            status_code=HTTPStatus.CREATED)
+        self.assertNotContains(response, 'Добавить комментарий',
+                               status_code=HTTPStatus.CREATED)
+        response = self.authorized_client.post(
+            CommentFormTest.url, data={'text': ''},
+            HTTP_ACCEPT='application/json'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertIn('text', response.json()['errors'])
+        self.assertEqual(CommentFormTest.post.comments.count(), 1)
@@ -1,8 +1,12 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
 from django.test import TestCase
 from django.conf import settings
+from django.core.management import call_command
 
-from ..models import Group, Post, Comment, Follow
+from ..models import AuthorStats, Group, Post, Comment, Follow
+from ..stats import get_author_stats
 
 User = get_user_model()
 
@@ -152,3 +156,78 @@ class FollowModelTest(TestCase):
                          'user.username + " подписан на " + '
                          'author.username'
                          )
+
+
+class AuthorStatsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        get_author_stats(cls.author)
+        get_author_stats(cls.reader)
+
+    def stats(self, user):
+        return AuthorStats.objects.get(author=user)
+
+    def test_posts_count_follows_posts(self):
+        """Проверяем, что счетчик постов меняется при создании
+        и удалении поста."""
+
+        post = Post.objects.create(author=self.author, text='Текст')
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        post.text = 'Новый текст'
+        post.save()
+        self.assertEqual(self.stats(self.author).posts_count, 1,
+                         'Редактирование поста не должно менять счетчик')
+        post.delete()
+        self.assertEqual(self.stats(self.author).posts_count, 0)
+
+    def test_follow_counts_follow_subscriptions(self):
+        """Проверяем, что счетчики подписчиков и подписок меняются
+        при подписке и отписке."""
+
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        follow.delete()
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    def test_rebuild_author_stats(self):
+        """Проверяем, что команда rebuild_author_stats пересчитывает
+        счетчики по данным таблиц."""
+
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Пост {i}') for i in range(3)
+        )
+        Follow.objects.bulk_create(
+            [Follow(user=self.reader, author=self.author)]
+        )
+        AuthorStats.objects.update(posts_count=100)
+        call_command('rebuild_author_stats', stdout=StringIO())
+        author_stats = self.stats(self.author)
+        self.assertEqual(author_stats.posts_count, 3)
+        self.assertEqual(author_stats.followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        self.assertEqual(self.stats(self.reader).posts_count, 0)
+
+    def test_comments_count_follows_comments(self):
+        """Проверяем, что счетчик комментариев поста меняется вместе
+        с комментариями и не затирается сохранением устаревшего поста."""
+
+        post = Post.objects.create(author=self.author, text='Пост')
+        stale = Post.objects.get(pk=post.pk)
+        comments = [
+            Comment.objects.create(post=post, author=self.reader,
+                                   text=f'Комментарий {i}')
+            for i in range(3)
+        ]
+        comments[0].delete()
+        stale.text = 'Исправленный пост'
+        stale.save()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 2)
+        Post.objects.update(comments_count=0)
+        call_command('rebuild_author_stats', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 2)
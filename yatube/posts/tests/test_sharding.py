@@ -0,0 +1,301 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from http import HTTPStatus
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Comment, Follow, Group, Post
+from ..sharding import allocate_id, shard_for_author
+from ..stats import get_author_stats
+from ..templatetags.cursor_pagination import next_cursor_query
+
+User = get_user_model()
+
+SHARDS = ['shard_a', 'shard_b']
+SHARD_SETTINGS = {
+    'POST_SHARDS': SHARDS,
+    'SEARCH_BACKEND': 'posts.search.LikeSearchBackend',
+    'CACHES': {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+        }
+    },
+}
+
+
+@override_settings(**SHARD_SETTINGS)
+class ShardingTests(TestCase):
+    databases = {DEFAULT_DB_ALIAS, *SHARDS}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        with override_settings(POST_SHARDS=SHARDS):
+            for alias in SHARDS:
+                connections.databases[alias] = dict(
+                    connections.databases[DEFAULT_DB_ALIAS],
+                    ENGINE='core.db_backends.sqlite_shard',
+                    NAME=os.path.join(cls.directory, f'{alias}.sqlite3')
+                )
+                call_command('migrate', database=alias, verbosity=0)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        for alias in SHARDS:
+            connections[alias].close()
+            del connections[alias]
+            del connections.databases[alias]
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        cls.authors = {}
+        for number in range(10):
+            user = User.objects.create_user(username=f'author{number}')
+            cls.authors.setdefault(shard_for_author(user.pk), user)
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(ShardingTests.reader)
+
+    def create_posts(self, count):
+        """Посты авторов из разных шардов вперемешку, с разными датами."""
+        start = timezone.now()
+        posts = []
+        for number in range(count):
+            author = list(self.authors.values())[number % len(SHARDS)]
+            post = Post.objects.create(author=author, group=self.group,
+                                       text=f'Пост {number}')
+            Post.objects.using(post._state.db).filter(pk=post.pk).update(
+                pub_date=start - timedelta(minutes=number)
+            )
+            posts.append(post)
+        return posts
+
+    def test_authors_in_both_shards(self):
+        """Проверяем, что тестовые авторы попали в оба шарда."""
+
+        self.assertEqual(set(self.authors), set(SHARDS))
+
+    def test_writes_go_to_author_shard(self):
+        """Проверяем, что пост пишется в шард автора, комментарий —
+        в шард поста, а id не пересекаются между шардами."""
+
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as queries:
+            posts = {alias: Post.objects.create(author=author, text=alias)
+                     for alias, author in self.authors.items()}
+        self.assertFalse([query for query in queries
+                          if 'posts_shardedid' in query['sql']])
+        for alias, post in posts.items():
+            self.assertEqual(post._state.db, alias)
+            self.assertTrue(
+                Post.objects.using(alias).filter(pk=post.pk).exists()
+            )
+        self.assertFalse(Post.objects.using(DEFAULT_DB_ALIAS).exists())
+        self.assertEqual(len({post.pk for post in posts.values()}),
+                         len(SHARDS))
+        for alias, post in posts.items():
+            self.assertEqual(post.pk % settings.POST_SHARD_ID_STRIDE,
+                             SHARDS.index(alias))
+        post = posts['shard_a']
+        comment = Comment.objects.create(
+            post=post, author=self.authors['shard_b'], text='Комментарий'
+        )
+        self.assertEqual(comment._state.db, 'shard_a')
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        author = User.objects.get(pk=self.authors['shard_a'].pk)
+        self.assertEqual(get_author_stats(author).posts_count, 1)
+
+    def test_index_merges_shards(self):
+        """Проверяем, что главная собирает посты всех шардов в общем
+        порядке по дате, в том числе на второй странице и по курсору."""
+
+        posts = self.create_posts(15)
+        first = self.client.get(reverse('posts:index'))
+        self.assertEqual([post.pk for post in first.context['page_obj']],
+                         [post.pk for post in posts[:10]])
+        self.assertEqual(first.context['page_obj'].paginator.count, 15)
+        second = self.client.get(reverse('posts:index') + '?page=2')
+        self.assertEqual([post.pk for post in second.context['page_obj']],
+                         [post.pk for post in posts[10:]])
+        query = next_cursor_query(first.context['page_obj'])
+        cursor = self.client.get(reverse('posts:index') + '?' + query)
+        self.assertEqual([post.pk for post in cursor.context['page_obj']],
+                         [post.pk for post in posts[10:]])
+        group = self.client.get(reverse('posts:group_detail',
+                                        kwargs={'slug': 'group'}))
+        self.assertEqual(len(group.context['page_obj']), 10)
+        found = self.client.get(reverse('posts:search') + '?q=1')
+        self.assertEqual(len(found.context['page_obj']), 6)
+
+    def test_profile_reads_one_shard(self):
+        """Проверяем, что профиль читает посты только из шарда автора."""
+
+        self.create_posts(4)
+        author = self.authors['shard_a']
+        with CaptureQueriesContext(connections['shard_b']) as queries:
+            response = self.client.get(
+                reverse('posts:profile', kwargs={'username': author})
+            )
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(len(response.context['page_obj']), 2)
+        self.assertEqual(response.context['count'], 2)
+
+    def test_follow_index(self):
+        """Проверяем, что лента подписок собирает посты из шардов
+        авторов, на которых подписан пользователь."""
+
+        self.create_posts(4)
+        author = self.authors['shard_b']
+        Follow.objects.create(user=self.reader, author=author)
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            {post.author_id for post in response.context['page_obj']},
+            {author.pk}
+        )
+        self.assertEqual(len(response.context['page_obj']), 2)
+
+    def test_post_detail_and_comment(self):
+        """Проверяем страницу поста и комментарий к посту из шарда."""
+
+        post = self.create_posts(2)[1]
+        url = reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        self.assertEqual(self.client.get(url).context['post'], post)
+        self.client.post(reverse('posts:add_comment',
+                                 kwargs={'post_id': post.pk}),
+                         data={'text': 'Комментарий из шарда'})
+        comment = Comment.objects.using(post._state.db).get()
+        self.assertEqual(comment.author, self.reader)
+        self.assertContains(self.client.get(url), 'Комментарий из шарда')
+
+    def test_delete_author_and_group(self):
+        """Проверяем, что удаление автора удаляет его посты и комментарии
+        в шардах, удаление группы отвязывает от нее посты шардов,
+        а страницы после этого открываются."""
+
+        posts = self.create_posts(4)
+        author = self.authors['shard_a']
+        kept = next(post for post in posts if post.author_id != author.pk)
+        Comment.objects.create(post=kept, author=author,
+                               text='Комментарий удаленного автора')
+        User.objects.get(pk=author.pk).delete()
+        Group.objects.get(pk=self.group.pk).delete()
+        for alias in SHARDS:
+            self.assertFalse(Post.objects.using(alias).filter(
+                author_id=author.pk
+            ).exists())
+            self.assertFalse(Comment.objects.using(alias).filter(
+                author_id=author.pk
+            ).exists())
+            self.assertFalse(Post.objects.using(alias).filter(
+                group_id=self.group.pk
+            ).exists())
+        kept.refresh_from_db()
+        self.assertEqual(kept.comments_count, 0)
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(len(response.context['page_obj']), 2)
+        response = self.client.get(reverse('posts:post_detail',
+                                           kwargs={'post_id': kept.pk}))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotContains(response, 'Комментарий удаленного автора')
+        self.assertEqual(
+            self.client.get(reverse('posts:profile',
+                                    kwargs={'username': kept.author})
+                            ).status_code,
+            HTTPStatus.OK
+        )
+        self.assertEqual(
+            self.client.get(reverse('posts:profile',
+                                    kwargs={'username': author})
+                            ).status_code,
+            HTTPStatus.NOT_FOUND
+        )
+
+    def test_api(self):
+        """Проверяем, что ленты и пакетное чтение постов в API
+        собирают посты из шардов с именами авторов и слагами групп."""
+
+        posts = self.create_posts(4)
+        author = self.authors['shard_b']
+        own = [post for post in posts if post.author_id == author.pk]
+        Follow.objects.create(user=self.reader, author=author)
+        urls = {
+            reverse('api:posts'): posts,
+            reverse('api:group_posts', kwargs={'slug': 'group'}): posts,
+            reverse('api:profile_posts', kwargs={'username': author}): own,
+            reverse('api:feed'): own,
+        }
+        for url, expected in urls.items():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                results = response.json()['results']
+                self.assertEqual([item['id'] for item in results],
+                                 [post.pk for post in expected])
+                self.assertEqual(
+                    [item['author'] for item in results],
+                    [post.author.username for post in expected]
+                )
+                self.assertEqual({item['group'] for item in results},
+                                 {'group'})
+        with mock.patch.object(User, 'from_db') as from_db:
+            response = Client().get(reverse('api:posts'))
+        from_db.assert_not_called()
+        self.assertEqual(response.json()['results'][0]['author'],
+                         posts[0].author.username)
+        other = next(post for post in posts if post not in own)
+        ids = [own[0].pk, 0, other.pk]
+        response = self.client.get(
+            reverse('api:posts_batch') + '?ids='
+            + ','.join(str(pk) for pk in ids)
+        ).json()
+        self.assertEqual([item['id'] for item in response['results']],
+                         [own[0].pk, other.pk])
+        self.assertEqual(response['missing'], [0])
+        self.assertEqual(response['results'][0]['author']['username'],
+                         author.username)
+        self.assertEqual(response['results'][0]['group']['slug'], 'group')
+
+    def test_rebalance(self):
+        """Проверяем, что rebalance_shards переносит посты с комментариями
+        из основной базы и лишних шардов в шарды авторов с теми же id."""
+
+        with override_settings(POST_SHARDS=[]):
+            old_post = Post.objects.create(author=self.authors['shard_b'],
+                                           text='Пост из основной базы')
+        with override_settings(POST_SHARDS=['shard_a']):
+            posts = self.create_posts(4)
+            Comment.objects.create(post=posts[1], author=self.reader,
+                                   text='Переедет вместе с постом')
+        call_command('rebalance_shards', stdout=open(os.devnull, 'w'))
+        for post in [old_post, *posts]:
+            alias = shard_for_author(post.author_id)
+            self.assertTrue(
+                Post.objects.using(alias).filter(pk=post.pk).exists()
+            )
+        self.assertFalse(Post.objects.using(DEFAULT_DB_ALIAS).exists())
+        self.assertEqual(Post.objects.using('shard_b').count(), 3)
+        moved = Post.objects.using('shard_b').get(pk=posts[1].pk)
+        self.assertEqual(moved.comments.get().text,
+                         'Переедет вместе с постом')
+        self.assertEqual(moved.comments_count, 1)
+        for alias in SHARDS:
+            self.assertGreater(allocate_id(alias),
+                               max(post.pk for post in [old_post, *posts]))
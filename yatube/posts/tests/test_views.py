@@ -1,15 +1,35 @@
+import os
 import shutil
 import tempfile
+import time
+from concurrent.futures import Future
+from io import StringIO
+from unittest import mock, skipUnless
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase, Client, override_settings
+from django.contrib.admin.sites import site
+from django.test import TestCase, Client, RequestFactory, override_settings
 from django.urls import reverse
 from django import forms
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
+from django.core.management import call_command
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.middleware.csrf import get_token
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
-from ..models import Group, Post, Follow, Comment
+from ..cards import render_cards
+from ..management.commands.bench_views import regressions, run_benchmarks
+from ..middleware import AnonymousPageCacheMiddleware
+from ..models import Group, Post, Follow, Comment, TimelineEntry
+from ..paginators import CachedCountPaginator, encode_cursor
+from ..templatetags.cursor_pagination import next_cursor_query
+from ..thumbnails import (cached_thumbnail, prefetch_thumbnails,
+                          submit_thumbnails)
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 TEST_CACHE_SETTING = {
@@ -21,6 +41,20 @@ TEST_CACHE_SETTING = {
 User = get_user_model()
 
 
+class WorkerExecutor:
+    """Выполняет задачу сразу, но, как процесс-воркер, со своим
+    экземпляром кэша по настройкам caches."""
+
+    def __init__(self, caches):
+        self.caches = caches
+
+    def submit(self, fn, *args):
+        future = Future()
+        with override_settings(CACHES=self.caches):
+            future.set_result(fn(*args))
+        return future
+
+
 @override_settings(CACHES=TEST_CACHE_SETTING)
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class PostPagesTests(TestCase):
@@ -292,6 +326,129 @@ class PostPagesTests(TestCase):
                          'Пост должен отсутствовать на странице '
                          f'"{PostPagesTests.group_1.slug}"')
 
+    def create_image_post(self, name):
+        return Post.objects.create(
+            author=PostPagesTests.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(
+                name=name,
+                content=(
+                    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+                    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+                    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+                    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+                    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+                    b'\x0A\x00\x3B'
+                ),
+                content_type='image/gif'
+            )
+        )
+
+    @override_settings(THUMBNAIL_WORKERS=0)
+    def test_post_image_thumbnail_fallback(self):
+        """Проверяем, что до создания миниатюры страница показывает
+        исходную картинку, а после — миниатюру."""
+
+        post = self.create_image_post('fallback.gif')
+        url = reverse('posts:post_detail', kwargs={'post_id': post.id})
+        self.assertIsNone(cached_thumbnail(post.image, '960x339'))
+        self.assertContains(self.authorized_client.get(url),
+                            f'src="{post.image.url}"')
+        submit_thumbnails(post.image.name)
+        thumbnail = cached_thumbnail(post.image, '960x339')
+        self.assertIsNotNone(thumbnail, 'Миниатюра должна быть создана')
+        response = self.authorized_client.get(url)
+        self.assertContains(response, f'src="{thumbnail.url}"')
+        self.assertNotContains(response, f'src="{post.image.url}"')
+
+    @override_settings(THUMBNAIL_WORKERS=2)
+    def test_thumbnail_workers_refresh_pages(self):
+        """Проверяем, что с процессами миниатюр страница, показанная
+        до создания миниатюры, после него показывает миниатюру — и с кэшем
+        в памяти процесса, и с общим кэшем."""
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        locmem = 'django.core.cache.backends.locmem.LocMemCache'
+        local = {'default': {'BACKEND': locmem, 'LOCATION': 'web'}}
+        worker_local = {'default': {'BACKEND': locmem,
+                                    'LOCATION': 'thumbnail_worker'}}
+        shared = {'default': {
+            'BACKEND': 'core.cache_backends.sqlite.SQLiteCache',
+            'LOCATION': os.path.join(directory, 'cache.sqlite3'),
+        }}
+        url = reverse('posts:index')
+        cases = ((local, worker_local, False), (shared, shared, True))
+        for number, (web, worker, in_worker) in enumerate(cases):
+            with self.subTest(cache=web['default']['BACKEND']), \
+                    override_settings(CACHES=web), \
+                    mock.patch('posts.thumbnails.get_executor',
+                               return_value=WorkerExecutor(worker)) as pool:
+                post = self.create_image_post(f'worker_{number}.gif')
+                self.assertContains(self.authorized_client.get(url),
+                                    f'src="{post.image.url}"')
+                submit_thumbnails(post.image.name)
+                self.assertEqual(pool.called, in_worker)
+                thumbnail = cached_thumbnail(post.image, '960x339')
+                self.assertIsNotNone(thumbnail,
+                                     'Миниатюра должна быть видна странице')
+                response = self.authorized_client.get(url)
+                self.assertContains(response, f'src="{thumbnail.url}"')
+                self.assertNotContains(response, f'src="{post.image.url}"')
+
+    def test_generate_thumbnails_command(self):
+        """Проверяем, что команда generate_thumbnails создает миниатюры
+        для существующих постов."""
+
+        post = self.create_image_post('backfill.gif')
+        call_command('generate_thumbnails', workers=0, stdout=StringIO())
+        self.assertIsNotNone(cached_thumbnail(post.image, '960x339'))
+
+    @override_settings(THUMBNAIL_WORKERS=0)
+    def test_page_thumbnails_single_lookup(self):
+        """Проверяем, что миниатюры всех постов страницы читаются
+        из хранилища одним запросом."""
+
+        posts = [self.create_image_post(f'page_{i}.gif') for i in range(3)]
+        for post in posts[1:]:
+            submit_thumbnails(post.image.name)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(reverse('posts:index'))
+        kvstore_queries = [query for query in queries
+                           if 'thumbnail_kvstore' in query['sql']]
+        self.assertEqual(len(kvstore_queries), 1,
+                         'Миниатюры страницы должны читаться одним запросом')
+        self.assertContains(response, f'src="{posts[0].image.url}"')
+        for post in posts[1:]:
+            self.assertContains(
+                response,
+                f'src="{cached_thumbnail(post.image, "960x339").url}"'
+            )
+
+    @override_settings(THUMBNAIL_WORKERS=0, CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    })
+    def test_prefetch_thumbnails_single_cache_call(self):
+        """Проверяем, что при прогретом кэше миниатюры страницы читаются
+        одним get_many без запросов к базе."""
+
+        posts = [self.create_image_post(f'warm_{i}.gif') for i in range(3)]
+        for post in posts:
+            submit_thumbnails(post.image.name)
+        prefetch_thumbnails(Post.objects.filter(pk__in=[p.pk for p in posts]))
+        with mock.patch.object(cache, 'get_many',
+                               wraps=cache.get_many) as get_many, \
+                self.assertNumQueries(0):
+            prefetched = prefetch_thumbnails(posts)
+        self.assertEqual(get_many.call_count, 1)
+        for post in prefetched:
+            self.assertEqual(
+                post.thumbnails['960x339'].name,
+                cached_thumbnail(post.image, '960x339').name
+            )
+
 
 class PaginatorViewsTest(TestCase):
     @classmethod
@@ -354,6 +511,323 @@ class PaginatorViewsTest(TestCase):
                     f'{PaginatorViewsTest.additional_post_number}')
 
 
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'post_counts',
+    }
+}, COUNT_ESTIMATE_THRESHOLD=10)
+class CachedCountPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test')
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Пост {number}')
+            for number in range(15)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def paginator(self, version='1', post_list=None):
+        if post_list is None:
+            post_list = Post.objects.all()
+        return CachedCountPaginator(post_list, 5, count_key='count',
+                                    count_version=version)
+
+    def test_count_cached_per_version(self):
+        """Проверяем, что число записей считается один раз на версию
+        ленты."""
+
+        posts = Post.objects.filter(author=CachedCountPaginatorTests.user)
+        with self.settings(COUNT_ESTIMATE_THRESHOLD=100):
+            self.assertEqual(self.paginator(post_list=posts).count, 15)
+            with self.assertNumQueries(0):
+                self.assertEqual(self.paginator(post_list=posts).count, 15)
+            Post.objects.filter(pk=posts.first().pk).delete()
+            self.assertEqual(self.paginator('2', posts).count, 14)
+
+    def test_huge_count_estimated_and_refreshed(self):
+        """Проверяем, что для большой выборки отдается оценка, а точное
+        число считается в фоне один раз."""
+
+        with mock.patch('posts.paginators.start_refresh') as refresh:
+            estimate = self.paginator().count
+            self.paginator().count
+        self.assertGreaterEqual(estimate, 11)
+        self.assertEqual(refresh.call_count, 1)
+        refresh.call_args.args[0]()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.paginator().count, 15)
+        with mock.patch('posts.paginators.start_refresh') as refresh, \
+                self.assertNumQueries(0):
+            self.assertEqual(self.paginator('2').count, 15,
+                             'Прежнее число до фонового пересчета')
+        self.assertEqual(refresh.call_count, 1)
+
+    def test_elided_page_range(self):
+        """Проверяем, что ссылки ведут только на соседние и крайние
+        страницы."""
+
+        paginator = CachedCountPaginator(Post.objects.all(), 1, total=100)
+        ellipsis = paginator.ELLIPSIS
+        self.assertEqual(
+            list(paginator.get_elided_page_range(50)),
+            [1, 2, ellipsis, 47, 48, 49, 50, 51, 52, 53, ellipsis, 99, 100]
+        )
+        self.assertEqual(list(paginator.get_elided_page_range(1)),
+                         [1, 2, 3, 4, ellipsis, 99, 100])
+        self.assertEqual(list(CachedCountPaginator(
+            Post.objects.all(), 5, total=15
+        ).get_elided_page_range(2)), [1, 2, 3])
+
+    def test_paginator_template_flat(self):
+        """Проверяем, что размер и время отрисовки блока пагинации
+        не растут с числом страниц."""
+
+        def render(total):
+            paginator = CachedCountPaginator(Post.objects.all(), 10,
+                                             total=total)
+            page_obj = paginator.get_page(paginator.num_pages // 2)
+            timings = []
+            for _ in range(5):
+                started = time.perf_counter()
+                html = render_to_string('posts/includes/paginator.html',
+                                        {'page_obj': page_obj})
+                timings.append(time.perf_counter() - started)
+            return len(html), min(timings)
+
+        small_size, small_time = render(1000)
+        large_size, large_time = render(10 ** 7)
+        self.assertLess(large_size - small_size, 100)
+        self.assertLess(large_time, small_time * 3 + 0.005)
+
+
+@override_settings(CACHES=TEST_CACHE_SETTING)
+class CursorPaginatorViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test',
+                                            email='test@test.test',
+                                            password='password')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create(
+            (
+                Post(author=cls.user,
+                     text=f'Новый тестовый пост {i}',
+                     group=cls.group)
+                for i in range(settings.NUMBER_OF_POSTS_DISPLAYED * 2 + 3)
+            )
+        )
+        Follow.objects.create(
+            user=User.objects.create_user(username='follower'),
+            author=cls.user
+        )
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_detail',
+                    kwargs={'slug': cls.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': cls.user.username}),
+            reverse('posts:follow_index'),
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(
+            User.objects.get(username='follower')
+        )
+
+    def get_page(self, url, query):
+        response = self.authorized_client.get(f'{url}?{query}')
+        return response.context.get('page_obj')
+
+    def walk(self, url, query, method):
+        pages = []
+        while query:
+            pages.append(self.get_page(url, query))
+            query = getattr(pages[-1], method)()
+        return pages
+
+    def test_cursor_pages_cover_feed(self):
+        """Проверяем, что переход по курсорам вперед и назад обходит
+        всю ленту без пропусков и повторов."""
+
+        expected = list(Post.objects.order_by('-pub_date', '-id'))
+        for url in CursorPaginatorViewsTest.urls:
+            with self.subTest(url=url):
+                first = self.get_page(url, '')
+                forward = [first] + self.walk(url,
+                                              next_cursor_query(first),
+                                              'next_query')
+                self.assertEqual(
+                    [post for page in forward for post in page],
+                    expected,
+                    f'Курсорная пагинация {url} должна обходить '
+                    'все посты по порядку')
+                backward = self.walk(url, forward[-1].previous_query(),
+                                     'previous_query')
+                self.assertEqual(
+                    [list(page) for page in backward],
+                    [list(page) for page in reversed(forward[:-1])],
+                    f'Переход назад по курсорам {url} должен '
+                    'возвращать предыдущие страницы')
+
+    def test_cursor_page_without_count(self):
+        """Проверяем, что курсорная страница не выполняет COUNT(*)."""
+
+        page_obj = self.authorized_client.get(
+            reverse('posts:index')
+        ).context.get('page_obj')
+        url = reverse('posts:index') + '?' + next_cursor_query(page_obj)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(url)
+        self.assertTrue(response.context.get('page_obj').is_cursor)
+        self.assertFalse(
+            any('COUNT(' in query['sql'] for query in queries),
+            'Курсорная страница не должна считать количество постов')
+
+    def test_invalid_cursor(self):
+        """Проверяем, что некорректный курсор открывает первую страницу."""
+
+        expected = list(
+            Post.objects.order_by('-pub_date', '-id')[
+                :settings.NUMBER_OF_POSTS_DISPLAYED
+            ]
+        )
+        for cursor in ('broken', 'MjAyMnwx', '!!!'):
+            with self.subTest(cursor=cursor):
+                response = self.authorized_client.get(
+                    reverse('posts:index'), {'before': cursor}
+                )
+                page_obj = response.context.get('page_obj')
+                self.assertEqual(list(page_obj.object_list), expected)
+                self.assertFalse(page_obj.has_previous())
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN для SQLite')
+@override_settings(CACHES=TEST_CACHE_SETTING)
+class QueryPlanTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author,
+            text='Тестовый пост',
+            group=cls.group,
+        )
+        Comment.objects.create(post=cls.post,
+                               author=cls.user,
+                               text='Тестовый комментарий')
+        Follow.objects.create(user=cls.user, author=cls.author)
+        cursor = encode_cursor(cls.post.pub_date.isoformat(), cls.post.pk)
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:index') + f'?before={cursor}',
+            reverse('posts:group_detail',
+                    kwargs={'slug': cls.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': cls.author.username}),
+            reverse('posts:post_detail',
+                    kwargs={'post_id': cls.post.id}),
+        )
+        cls.follow_urls = (
+            reverse('posts:follow_index'),
+            reverse('posts:follow_index') + f'?after={cursor}',
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(QueryPlanTests.user)
+
+    @staticmethod
+    def explain(sql):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def test_view_queries_use_indexes(self):
+        """Проверяем, что запросы страниц к постам, комментариям
+        и подпискам идут по индексам без сортировки во временном
+        B-дереве."""
+
+        self.assert_indexed(QueryPlanTests.urls)
+
+    def test_follow_queries_start_from_follows(self):
+        """Проверяем, что лента подписок идет от индекса подписок
+        к постам авторов по индексу, а не обходом всех постов. Сортируются
+        только посты авторов из подписок."""
+
+        self.assert_indexed(QueryPlanTests.follow_urls, sorts=True)
+        for url in QueryPlanTests.follow_urls:
+            with CaptureQueriesContext(connection) as queries:
+                self.authorized_client.get(url)
+            for query in queries:
+                if '"posts_post"' not in query['sql']:
+                    continue
+                plan = self.explain(query['sql'])
+                with self.subTest(url=url, sql=query['sql']):
+                    self.assertFalse(
+                        [step for step in plan
+                         if step.startswith('SCAN posts_post')],
+                        f'Лента подписок обходит все посты: {plan}')
+
+    @override_settings(TIMELINE_ENABLED=True)
+    def test_timeline_queries_use_indexes(self):
+        """Проверяем, что лента подписок из TimelineEntry читается
+        по индексу."""
+
+        self.assert_indexed((reverse('posts:follow_index'),))
+
+    @override_settings(TIMELINE_ENABLED=True, TIMELINE_FANOUT_LIMIT=0)
+    def test_timeline_merge_queries_use_indexes(self):
+        """Проверяем, что лента с авторами выше предела рассылки
+        сливает записи TimelineEntry и посты этих авторов по индексам."""
+
+        cursor = encode_cursor(QueryPlanTests.post.pub_date.isoformat(),
+                               QueryPlanTests.post.pk)
+        self.assert_indexed((
+            reverse('posts:follow_index'),
+            reverse('posts:follow_index') + f'?before={cursor}',
+            reverse('posts:follow_index') + f'?after={cursor}',
+        ))
+
+    def assert_indexed(self, urls, sorts=False):
+        for url in urls:
+            with CaptureQueriesContext(connection) as queries:
+                self.authorized_client.get(url)
+            for query in queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT') or '"posts_' not in sql:
+                    continue
+                plan = self.explain(sql)
+                with self.subTest(url=url, sql=sql):
+                    self.assertFalse(
+                        [step for step in plan
+                         if 'TEMP B-TREE' in step and not sorts],
+                        f'Запрос страницы {url} сортирует без индекса: '
+                        f'{plan}')
+                    self.assertFalse(
+                        [step for step in plan
+                         if step.startswith('SCAN') and 'USING' not in step
+                         and step != 'SCAN subquery'],
+                        f'Запрос страницы {url} читает таблицу целиком: '
+                        f'{plan}')
+
+
 class CachePagesTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -361,40 +835,99 @@ class CachePagesTests(TestCase):
         cls.user = User.objects.create_user(username='test',
                                             email='test@test.test',
                                             password='password')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
         cls.post = Post.objects.create(
             author=cls.user,
             text='Тестовая пост',
+            group=cls.group,
+        )
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_detail',
+                    kwargs={'slug': cls.group.slug}),
+            reverse('posts:profile',
+                    kwargs={'username': cls.user.username}),
         )
 
     def setUp(self):
+        cache.clear()
         self.authorized_client = Client()
         self.authorized_client.force_login(CachePagesTests.user)
 
-    def test_cache_index_page(self):
-        """Проверяем, что главная страница кэшируется."""
+    def test_cache_pages(self):
+        """Проверяем, что главная страница, страницы группы и профиля
+        кэшируются, пока посты не меняются."""
 
-        post = Post.objects.create(
-            author=CachePagesTests.user,
-            text='Тестовая пост до кэширования',
+        for url in CachePagesTests.urls:
+            with self.subTest(url=url):
+                response_before = self.authorized_client.get(url)
+                Post.objects.filter(pk=CachePagesTests.post.pk).update(
+                    text='Изменено в обход сигналов'
+                )
+                response_after = self.authorized_client.get(url)
+                self.assertEqual(response_before.content,
+                                 response_after.content,
+                                 f'Страница {url} должна браться из кэша')
+                cache.clear()
+                response_clear = self.authorized_client.get(url)
+                self.assertNotEqual(response_after.content,
+                                    response_clear.content,
+                                    f'После очистки кэша страница {url} '
+                                    'должна измениться')
+                Post.objects.filter(pk=CachePagesTests.post.pk).update(
+                    text='Тестовая пост'
+                )
+                cache.clear()
+
+    def test_cache_invalidated_by_post_changes(self):
+        """Проверяем, что новый и удаленный пост сразу видны на
+        закэшированных страницах."""
+
+        for url in CachePagesTests.urls:
+            with self.subTest(url=url):
+                self.authorized_client.get(url)
+                post = Post.objects.create(
+                    author=CachePagesTests.user,
+                    text='Новый пост после кэширования',
+                    group=CachePagesTests.group,
+                )
+                response_created = self.authorized_client.get(url)
+                self.assertContains(response_created, post.text,
+                                    msg_prefix=f'Новый пост должен сразу '
+                                               f'появиться на {url}')
+                post.delete()
+                response_deleted = self.authorized_client.get(url)
+                self.assertNotContains(response_deleted, post.text,
+                                       msg_prefix=f'Удаленный пост должен '
+                                                  f'сразу пропасть с {url}')
+
+    def test_cache_invalidated_by_group_changes(self):
+        """Проверяем, что изменение группы и перенос поста в другую группу
+        сбрасывают кэш страниц."""
+
+        url_profile = reverse(
+            'posts:profile',
+            kwargs={'username': CachePagesTests.user.username}
         )
-        url = reverse('posts:index')
-        response_before = self.authorized_client.get(url)
-        self.assertIn(
-            post,
-            response_before.context.get('page_obj').object_list,
-            'Пост должен быть на главной странице до кэширования')
-        post.delete()
-        response_after = self.authorized_client.get(url)
-        self.assertEqual(response_before.content,
-                         response_after.content,
-                         'Содержимое страницы после удаления поста '
-                         'должно не измениться')
-        cache.clear()
-        response_clear = self.authorized_client.get(url)
-        self.assertNotEqual(response_after.content,
-                            response_clear.content,
-                            'Содержимое страницы после удаления поста '
-                            'и очистки кэша должно измениться')
+        self.authorized_client.get(url_profile)
+        CachePagesTests.group.title = 'Переименованная группа'
+        CachePagesTests.group.save()
+        self.assertContains(self.authorized_client.get(url_profile),
+                            'переименованная группа')
+        url_group = reverse('posts:group_detail',
+                            kwargs={'slug': CachePagesTests.group.slug})
+        self.assertContains(self.authorized_client.get(url_group),
+                            CachePagesTests.post.text)
+        post = Post.objects.get(pk=CachePagesTests.post.pk)
+        post.group = Group.objects.create(title='Другая группа',
+                                          slug='other_slug')
+        post.save()
+        self.assertNotContains(self.authorized_client.get(url_group),
+                               CachePagesTests.post.text)
 
 
 class FollowTests(TestCase):
@@ -529,6 +1062,145 @@ class FollowTests(TestCase):
             'Пост должен отсутствовать в ленте подписанного пользователя'
         )
 
+    def test_profile_counters_without_count_queries(self):
+        """Проверяем, что профиль и страница поста берут счетчики
+        из AuthorStats, не выполняя COUNT."""
+
+        self.authorized_client_1.get(FollowTests.url_follow)
+        urls = (
+            FollowTests.url_profile,
+            reverse('posts:post_detail',
+                    kwargs={'post_id': FollowTests.post_2.id}),
+        )
+        for url in urls:
+            self.authorized_client_1.get(url)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.authorized_client_1.get(url)
+            with self.subTest(url=url):
+                self.assertEqual(response.context.get('count'), 1)
+                self.assertFalse(
+                    any('COUNT(' in query['sql'] for query in queries),
+                    f'Страница {url} не должна считать посты автора')
+        stats = self.authorized_client_1.get(
+            FollowTests.url_profile
+        ).context.get('stats')
+        self.assertEqual(stats.followers_count, 2)
+        self.assertEqual(stats.following_count, 0)
+
+
+@override_settings(CACHES=TEST_CACHE_SETTING,
+                   TIMELINE_ENABLED=True,
+                   TIMELINE_FANOUT_LIMIT=3)
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.fan = User.objects.create_user(username='fan')
+        cls.other = User.objects.create_user(username='other')
+        cls.extra = User.objects.create_user(username='extra')
+        cls.author = User.objects.create_user(username='author')
+        cls.celebrity = User.objects.create_user(username='celebrity')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Follow.objects.create(user=cls.fan, author=cls.author)
+        for user in (cls.reader, cls.fan, cls.other, cls.extra):
+            Follow.objects.create(user=user, author=cls.celebrity)
+        cls.url_follow_index = reverse('posts:follow_index')
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(TimelineTests.reader)
+
+    def feed(self, client=None):
+        response = (client or self.reader_client).get(
+            TimelineTests.url_follow_index
+        )
+        return response.context.get('page_obj')
+
+    def test_post_fans_out_to_followers(self):
+        """Проверяем, что новый пост попадает в ленты подписчиков
+        и страница подписок читает его из ленты."""
+
+        post = Post.objects.create(author=TimelineTests.author,
+                                   text='Пост для ленты')
+        self.assertEqual(
+            set(post.timeline_entries.values_list('user', flat=True)),
+            {TimelineTests.reader.id, TimelineTests.fan.id},
+            'Пост должен быть разослан всем подписчикам автора')
+        self.assertIn(post, self.feed().object_list,
+                      'Пост должен быть в ленте подписчика')
+
+    def test_celebrity_fan_out_on_read(self):
+        """Проверяем, что посты авторов с большим числом подписчиков
+        не рассылаются, а читаются при открытии ленты."""
+
+        post = Post.objects.create(author=TimelineTests.celebrity,
+                                   text='Пост популярного автора')
+        self.assertFalse(post.timeline_entries.exists(),
+                         'Пост популярного автора не должен рассылаться')
+        self.assertIn(post, self.feed().object_list,
+                      'Пост популярного автора должен быть в ленте')
+
+    def test_celebrity_posts_kept_below_limit(self):
+        """Проверяем, что посты, написанные, пока у автора было больше
+        подписчиков, чем рассылается, остаются в лентах, когда
+        подписчиков становится меньше."""
+
+        post = Post.objects.create(author=TimelineTests.celebrity,
+                                   text='Пост популярного автора')
+        with mock.patch('posts.timeline.transaction.on_commit') as on_commit, \
+                mock.patch('posts.timeline.start_refresh') as start_refresh:
+            Follow.objects.filter(user=TimelineTests.extra,
+                                  author=TimelineTests.celebrity).delete()
+            self.assertFalse(post.timeline_entries.exists(),
+                             'Ленты дополняются после коммита в фоне')
+            on_commit.call_args.args[0]()
+            start_refresh.call_args.args[0]()
+        self.assertEqual(
+            set(post.timeline_entries.values_list('user', flat=True)),
+            {TimelineTests.reader.id, TimelineTests.fan.id,
+             TimelineTests.other.id},
+            'Пост должен быть дописан в ленты оставшихся подписчиков')
+        self.assertIn(post, self.feed().object_list,
+                      'Пост должен остаться в ленте подписчика')
+
+    def test_unfollow_and_delete_clean_timeline(self):
+        """Проверяем, что отписка и удаление поста убирают записи
+        из ленты."""
+
+        post = Post.objects.create(author=TimelineTests.author,
+                                   text='Пост для ленты')
+        self.reader_client.get(reverse(
+            'posts:profile_unfollow',
+            kwargs={'username': TimelineTests.author.username}
+        ))
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=TimelineTests.reader).exists(),
+            'После отписки записи автора должны пропасть из ленты')
+        self.assertNotIn(post, self.feed().object_list)
+        post.delete()
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=TimelineTests.fan).exists(),
+            'После удаления поста он должен пропасть из лент')
+
+    def test_follow_backfills_timeline(self):
+        """Проверяем, что при подписке старые посты автора попадают
+        в ленту, а команда пересборки восстанавливает ленты."""
+
+        post = Post.objects.create(author=TimelineTests.author,
+                                   text='Пост до подписки')
+        Follow.objects.create(user=TimelineTests.other,
+                              author=TimelineTests.author)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=TimelineTests.other,
+                                         post=post).exists(),
+            'При подписке посты автора должны попасть в ленту')
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timeline', stdout=StringIO())
+        self.assertEqual(
+            TimelineEntry.objects.filter(post=post).count(), 3,
+            'Команда пересборки должна восстановить ленты подписчиков')
+
 
 class CommentTests(TestCase):
     @classmethod
@@ -548,7 +1220,7 @@ class CommentTests(TestCase):
 
     def setUp(self):
         self.authorized_client = Client()
-        self.authorized_client.force_login(CachePagesTests.user)
+        self.authorized_client.force_login(CommentTests.user)
 
     def test_comment_context(self):
         """Проверяем, что комментарии присутствуют в контексте страницы
@@ -572,3 +1244,473 @@ class CommentTests(TestCase):
                          response_post_2.context.get('comments'),
                          'Комментарий должен отсутствовать в '
                          'контексте страницы')
+
+    @override_settings(COMMENTS_PER_PAGE=3)
+    def test_comments_paginated(self):
+        """Проверяем, что на странице поста первая страница комментариев
+        по дате, а следующие отдаются фрагментом."""
+
+        post = CommentTests.post_1
+        comments = [
+            Comment.objects.create(post=post, author=CommentTests.user,
+                                   text=f'Комментарий {i}')
+            for i in range(7)
+        ]
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.id})
+        )
+        page = response.context.get('comments')
+        self.assertEqual(list(page), comments[:3])
+        self.assertContains(response, 'Комментарии: 7')
+        more_url = (reverse('posts:post_comments',
+                            kwargs={'post_id': post.id})
+                    + '?' + page.next_query())
+        self.assertContains(response, more_url.replace('&', '&amp;'))
+        seen = list(page)
+        while page.has_next():
+            response = self.authorized_client.get(
+                reverse('posts:post_comments', kwargs={'post_id': post.id})
+                + '?' + page.next_query(),
+                HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+            )
+            self.assertNotContains(response, '<html')
+            page = response.context.get('comments')
+            seen.extend(page)
+        self.assertEqual(seen, comments)
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'conditional',
+    }
+})
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый пост',
+            group=cls.group,
+        )
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_detail', kwargs={'slug': cls.group.slug}),
+            reverse('posts:profile', kwargs={'username': cls.user.username}),
+            reverse('posts:post_detail', kwargs={'post_id': cls.post.id}),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(ConditionalGetTests.reader)
+
+    def assert_not_modified(self, client, url):
+        response = client.get(url)
+        queries = 0 if url == reverse('posts:index') else 1
+        if client is self.authorized_client:
+            queries += 2
+        with self.assertNumQueries(queries):
+            not_modified = client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag']
+            )
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertFalse(not_modified.templates,
+                         'Для ответа 304 шаблон не должен рендериться')
+        return response
+
+    def test_not_modified(self):
+        """Проверяем, что повторный запрос с тем же ETag получает 304
+        без рендеринга шаблона."""
+
+        for url in ConditionalGetTests.urls:
+            with self.subTest(url=url):
+                response = self.assert_not_modified(self.guest_client, url)
+                self.assertIn('Last-Modified', response)
+                self.assertEqual(
+                    self.guest_client.get(
+                        url,
+                        HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+                    ).status_code,
+                    304
+                )
+
+    def test_validators_depend_on_user(self):
+        """Проверяем, что ETag зависит от пользователя, а вошедшим
+        пользователям не отдается Last-Modified."""
+
+        for url in ConditionalGetTests.urls:
+            with self.subTest(url=url):
+                guest = self.guest_client.get(url)
+                response = self.assert_not_modified(self.authorized_client,
+                                                    url)
+                self.assertNotEqual(guest['ETag'], response['ETag'])
+                self.assertNotIn('Last-Modified', response)
+
+    def test_changes_reset_validators(self):
+        """Проверяем, что новый пост, комментарий, правка поста и подписка
+        меняют ETag затронутых страниц."""
+
+        post = ConditionalGetTests.post
+        changes = (
+            (lambda: Post.objects.create(author=ConditionalGetTests.user,
+                                         text='Новый пост',
+                                         group=ConditionalGetTests.group),
+             ConditionalGetTests.urls),
+            (lambda: Comment.objects.create(post=post,
+                                            author=ConditionalGetTests.user,
+                                            text='Комментарий'),
+             ConditionalGetTests.urls[3:]),
+            (lambda: Post.objects.filter(pk=post.pk).update(
+                text='Правка', updated=post.updated.replace(year=2100)
+            ), ConditionalGetTests.urls[3:]),
+            (lambda: Follow.objects.create(user=ConditionalGetTests.reader,
+                                           author=ConditionalGetTests.user),
+             ConditionalGetTests.urls[2:3]),
+        )
+        for change, urls in changes:
+            etags = {url: self.guest_client.get(url)['ETag'] for url in urls}
+            change()
+            for url in urls:
+                with self.subTest(url=url):
+                    response = self.guest_client.get(
+                        url, HTTP_IF_NONE_MATCH=etags[url]
+                    )
+                    self.assertEqual(response.status_code, 200)
+
+    def test_missing_object(self):
+        """Проверяем, что для несуществующих объектов возвращается 404."""
+
+        urls = (
+            reverse('posts:group_detail', kwargs={'slug': 'missing'}),
+            reverse('posts:profile', kwargs={'username': 'missing'}),
+            reverse('posts:post_detail', kwargs={'post_id': 100500}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.guest_client.get(url).status_code, 404)
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'page_cache',
+    }
+})
+class AnonymousPageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+        cls.url = reverse('posts:index')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(AnonymousPageCacheTests.user)
+
+    def test_anonymous_page_cached(self):
+        """Проверяем, что анонимному посетителю страница отдается из кэша
+        без запросов к базе, а вошедшему — нет."""
+
+        url = AnonymousPageCacheTests.url
+        first = self.guest_client.get(url)
+        self.assertEqual(first['X-Page-Cache'], 'miss')
+        with self.assertNumQueries(0):
+            second = self.guest_client.get(url)
+        self.assertEqual(second['X-Page-Cache'], 'hit')
+        self.assertEqual(second.content, first.content)
+        self.assertNotIn('X-Page-Cache', self.authorized_client.get(url))
+
+    def test_feed_version_invalidates_page(self):
+        """Проверяем, что новый пост сразу сбрасывает кэш страницы."""
+
+        url = AnonymousPageCacheTests.url
+        self.guest_client.get(url)
+        Post.objects.create(author=AnonymousPageCacheTests.user,
+                            text='Свежий пост')
+        response = self.guest_client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Свежий пост')
+
+    def test_stale_page_single_refresh(self):
+        """Проверяем, что устаревшая страница отдается, пока ее
+        пересобирает единственное фоновое обновление."""
+
+        url = AnonymousPageCacheTests.url
+        self.guest_client.get(url)
+        later = time.time() + settings.PAGE_CACHE_TIMEOUT + 1
+        with mock.patch('posts.middleware.time.time', return_value=later), \
+                mock.patch('posts.middleware.start_refresh') as refresh:
+            for _ in range(3):
+                response = self.guest_client.get(url)
+                self.assertEqual(response['X-Page-Cache'], 'stale')
+            self.assertEqual(refresh.call_count, 1)
+            refresh.call_args[0][0]()
+            response = self.guest_client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'hit',
+                         'После обновления страница снова свежая')
+
+    def test_csrf_and_cookie_responses_not_cached(self):
+        """Проверяем, что ответы с CSRF-токеном или cookie
+        не попадают в кэш."""
+
+        def with_token(request):
+            get_token(request)
+            return HttpResponse('token')
+
+        def with_cookie(request):
+            response = HttpResponse('cookie')
+            response.set_cookie('name', 'value')
+            return response
+
+        for get_response in (with_token, with_cookie):
+            with self.subTest(view=get_response.__name__):
+                middleware = AnonymousPageCacheMiddleware(get_response)
+                request = RequestFactory().get(AnonymousPageCacheTests.url)
+                request.user = AnonymousUser()
+                middleware(request)
+                self.assertIsNone(
+                    cache.get(middleware.cache_key(request)),
+                    'Ответ не должен сохраниться в кэше'
+                )
+
+
+@override_settings(CACHES=TEST_CACHE_SETTING)
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test')
+        cls.post_cat = Post.objects.create(
+            author=cls.user,
+            text='Кот <b>гуляет</b> сам по себе',
+        )
+        cls.post_cats = Post.objects.create(
+            author=cls.user,
+            text='Кот и кот: котики повсюду',
+        )
+        cls.post_dog = Post.objects.create(
+            author=cls.user,
+            text='Собака лает',
+        )
+        cls.url = reverse('posts:search')
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def search(self, query, **params):
+        return self.guest_client.get(SearchTests.url,
+                                     dict(params, q=query))
+
+    def test_search_ranked_with_snippets(self):
+        """Проверяем, что поиск находит посты по началу слова,
+        ранжирует их и подсвечивает найденные слова."""
+
+        response = self.search('кот')
+        posts = list(response.context.get('page_obj').object_list)
+        self.assertEqual(posts, [SearchTests.post_cats,
+                                 SearchTests.post_cat])
+        self.assertContains(response, '<mark>Кот</mark> &lt;b&gt;гуляет')
+        self.assertContains(response, '<mark>котики</mark>')
+        self.assertFalse(
+            self.search('!!!').context.get('page_obj').object_list,
+            'Запрос без слов не должен ничего находить')
+
+    def test_search_index_follows_posts(self):
+        """Проверяем, что изменение и удаление поста сразу отражаются
+        в поисковом индексе."""
+
+        post = SearchTests.post_dog
+        post.text = 'Собака спит'
+        post.save()
+        self.assertFalse(
+            self.search('лает').context.get('page_obj').object_list)
+        self.assertIn(
+            post, self.search('спит').context.get('page_obj').object_list)
+        post.delete()
+        self.assertFalse(
+            self.search('собака').context.get('page_obj').object_list)
+
+    def test_search_cursor_pagination(self):
+        """Проверяем, что результаты поиска листаются курсорами
+        без потери запроса."""
+
+        Post.objects.bulk_create(
+            Post(author=SearchTests.user, text=f'Попугай номер {i}')
+            for i in range(settings.NUMBER_OF_POSTS_DISPLAYED + 3)
+        )
+        call_command('rebuild_search_index', stdout=StringIO())
+        response = self.search('попугай')
+        page_obj = response.context.get('page_obj')
+        self.assertEqual(len(page_obj.object_list),
+                         settings.NUMBER_OF_POSTS_DISPLAYED)
+        query = next_cursor_query(page_obj)
+        self.assertContains(response, f'href="?q=%D0%BF%D0%BE%D0%BF%D1%83'
+                                      f'%D0%B3%D0%B0%D0%B9&amp;{query}"')
+        cursor_page = self.guest_client.get(
+            SearchTests.url + '?q=попугай&' + query
+        ).context.get('page_obj')
+        self.assertTrue(cursor_page.is_cursor)
+        self.assertEqual(len(cursor_page.object_list), 3)
+        found = set(page_obj.object_list) | set(cursor_page.object_list)
+        self.assertEqual(len(found), settings.NUMBER_OF_POSTS_DISPLAYED + 3)
+
+    def test_admin_search_uses_index(self):
+        """Проверяем, что поиск в админке идет по поисковому индексу."""
+
+        model_admin = site._registry[Post]
+        request = RequestFactory().get('/admin/posts/post/')
+        with CaptureQueriesContext(connection) as queries:
+            queryset, use_distinct = model_admin.get_search_results(
+                request, Post.objects.all(), 'котик'
+            )
+            found = list(queryset)
+        self.assertEqual(found, [SearchTests.post_cats])
+        self.assertFalse(use_distinct)
+        self.assertIn('posts_post_fts', queries[0]['sql'])
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'post_cards',
+    }
+})
+class PostCardsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test',
+                                            first_name='Лев')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(title='Котики', slug='cats',
+                                         description='Тестовое описание')
+        Post.objects.bulk_create(
+            Post(author=cls.other, text=f'Пост {number}')
+            for number in range(settings.NUMBER_OF_POSTS_DISPLAYED - 1)
+        )
+        cls.post = Post.objects.create(author=cls.user, group=cls.group,
+                                       text='Пост в группе')
+
+    def setUp(self):
+        cache.clear()
+
+    def page_posts(self):
+        return list(Post.objects.select_related('author', 'group')[
+            :settings.NUMBER_OF_POSTS_DISPLAYED
+        ])
+
+    def render(self):
+        with mock.patch('posts.cards.render_to_string',
+                        wraps=render_to_string) as render, \
+                mock.patch.object(cache, 'get_many',
+                                  wraps=cache.get_many) as get_many:
+            cards = render_cards(self.page_posts(), show_link_group=True,
+                                 show_link_profile=True)
+        rendered = [call.args[1]['post'].pk for call in render.call_args_list]
+        return cards, rendered, get_many.call_count
+
+    def test_cards_rendered_once(self):
+        """Проверяем, что карточки читаются одним get_many на страницу,
+        а повторно шаблон не рендерится."""
+
+        first, rendered, _ = self.render()
+        self.assertEqual(len(rendered), settings.NUMBER_OF_POSTS_DISPLAYED)
+        second, rendered, get_many_calls = self.render()
+        self.assertEqual(second, first)
+        self.assertEqual(rendered, [])
+        self.assertEqual(get_many_calls, 2, 'Версии и карточки')
+
+    def test_cards_invalidated_by_signals(self):
+        """Проверяем, что изменение поста, группы или автора
+        перерисовывает только его карточки."""
+
+        post = PostCardsTests.post
+        self.render()
+        post.text = 'Новый текст'
+        post.save()
+        self.assert_rerendered(post, 'Новый текст')
+        group = PostCardsTests.group
+        group.title = 'Собачки'
+        group.save()
+        self.assert_rerendered(post, 'собачки')
+        author = PostCardsTests.user
+        author.first_name = 'Кот'
+        author.save()
+        self.assert_rerendered(post, 'Кот')
+
+    def test_author_rename_refreshes_group_page(self):
+        """Проверяем, что после смены имени автора страница группы
+        с его постом показывает новое имя и гостю, и пользователю."""
+
+        url = reverse('posts:group_detail',
+                      kwargs={'slug': PostCardsTests.group.slug})
+        clients = {'guest': Client(), 'reader': Client()}
+        clients['reader'].force_login(PostCardsTests.other)
+        for client in clients.values():
+            self.assertContains(client.get(url), 'Лев')
+        author = PostCardsTests.user
+        author.first_name = 'Кот'
+        author.save()
+        for name, client in clients.items():
+            with self.subTest(client=name):
+                response = client.get(url)
+                self.assertContains(response, 'Кот')
+                self.assertNotContains(response, 'Лев')
+
+    def assert_rerendered(self, post, text):
+        cards, rendered, _ = self.render()
+        self.assertEqual(rendered, [post.pk])
+        self.assertIn(text, cards[0])
+
+
+@override_settings(CACHES=TEST_CACHE_SETTING)
+class BenchViewsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command('generate_load_data', users=20, groups=2, posts=60,
+                     comments=80, follows_per_user=5, workers=0,
+                     stdout=StringIO())
+
+    def test_run_benchmarks(self):
+        """Проверяем, что прогон bench_views меряет все сценарии."""
+
+        results = run_benchmarks(iterations=2, warmup=0,
+                                 memory_iterations=1)
+        self.assertEqual(set(results), {
+            'index', 'group_posts', 'profile', 'post_detail',
+            'follow_index', 'add_comment', 'post_create',
+        })
+        for metrics in results.values():
+            self.assertEqual(metrics['count'], 2)
+            self.assertGreater(metrics['queries'], 0)
+            self.assertGreater(metrics['bytes'], 0)
+            self.assertLessEqual(metrics['p50'], metrics['p99'])
+
+    def test_regressions(self):
+        """Проверяем, что регрессия — это рост больше и доли, и
+        абсолютного порога."""
+
+        baseline = {'index': {'p50': 10.0, 'queries': 4}}
+        thresholds = {'p50': (0.5, 2), 'queries': (0, 0)}
+        self.assertEqual(regressions({'index': {'p50': 14.9, 'queries': 4}},
+                                     baseline, thresholds), [])
+        self.assertEqual(
+            regressions({'index': {'p50': 15.1, 'queries': 5},
+                         'new_view': {'p50': 100.0}},
+                        baseline, thresholds),
+            ['index.p50: 15.1 > 10.0 (+50%, +2)',
+             'index.queries: 5 > 4 (+0%, +0)']
+        )
@@ -0,0 +1,171 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.kvstores.cached_db_kvstore import (
+    KVStore as CachedDBKVStore
+)
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from .feed_cache import (INDEX, bump_feed_versions, card_post_scope,
+                         group_scope, profile_scope)
+from .models import Post
+from .sharding import each_shard
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_executor = None
+
+
+def thumbnail_options(geometry):
+    return dict(settings.POST_THUMBNAILS[geometry])
+
+
+def thumbnail_file(file_, geometry):
+    """Файл миниатюры с именем, которое для этих параметров вычислит
+    get_thumbnail. Сама миниатюра может еще не существовать."""
+    backend = default.backend
+    source = ImageFile(file_)
+    options = thumbnail_options(geometry)
+    if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(thumbnail_settings, attr)
+        if value != getattr(default_settings, attr):
+            options.setdefault(key, value)
+    name = backend._get_thumbnail_filename(source, geometry, options)
+    return ImageFile(name, default.storage)
+
+
+def cached_thumbnail(file_, geometry):
+    return get_many_thumbnails({None: thumbnail_file(file_, geometry)})[None]
+
+
+def get_many_thumbnails(files):
+    """Читает из хранилища sorl сразу много миниатюр: один get_many
+    к кэшу и, для промахов, один запрос к таблице KVStore. Отсутствие
+    миниатюры кэшируется только на THUMBNAIL_MISS_TIMEOUT: sorl держит
+    его годами, и миниатюра, созданная после промаха, не показывалась
+    бы."""
+    kvstore = default.kvstore
+    if not isinstance(kvstore, CachedDBKVStore):
+        return {key: kvstore.get(file_) for key, file_ in files.items()}
+    raw_keys = {key: add_prefix(file_.key) for key, file_ in files.items()}
+    values = kvstore.cache.get_many(raw_keys.values())
+    missing = set(raw_keys.values()) - set(values)
+    if missing:
+        found = dict(KVStoreModel.objects.filter(
+            key__in=missing
+        ).values_list('key', 'value'))
+        if found:
+            kvstore.cache.set_many(
+                found, thumbnail_settings.THUMBNAIL_CACHE_TIMEOUT
+            )
+        empty = {key: EMPTY_VALUE for key in missing - set(found)}
+        if empty:
+            kvstore.cache.set_many(empty, settings.THUMBNAIL_MISS_TIMEOUT)
+        values.update(found)
+        values.update(empty)
+    return {
+        key: deserialize_image_file(values[raw_key])
+        if values[raw_key] != EMPTY_VALUE else None
+        for key, raw_key in raw_keys.items()
+    }
+
+
+def prefetch_thumbnails(posts):
+    """Проставляет постам словарь thumbnails {геометрия: миниатюра или
+    None} за одно обращение к хранилищу."""
+    files = {
+        (post.pk, geometry): thumbnail_file(post.image, geometry)
+        for post in posts if post.image
+        for geometry in settings.POST_THUMBNAILS
+    }
+    thumbnails = get_many_thumbnails(files) if files else {}
+    for post in posts:
+        post.thumbnails = {
+            geometry: thumbnails.get((post.pk, geometry))
+            for geometry in settings.POST_THUMBNAILS
+        }
+    return posts
+
+
+def generate_thumbnails(name):
+    for geometry in settings.POST_THUMBNAILS:
+        get_thumbnail(name, geometry, **thumbnail_options(geometry))
+    scopes = {INDEX}
+    for queryset in each_shard(Post.objects.filter(image=name)):
+        for post_id, author_id, group_id in queryset.values_list(
+            'pk', 'author_id', 'group_id'
+        ):
+            scopes.add(card_post_scope(post_id))
+            scopes.add(profile_scope(author_id))
+            if group_id:
+                scopes.add(group_scope(group_id))
+    bump_feed_versions(*scopes)
+    return name
+
+
+def shared_cache():
+    """Кэш, который процессы миниатюр делят с веб-процессами. В кэш
+    в памяти процесса воркер запишет миниатюру и новые версии лент
+    только для себя."""
+    kvstore = default.kvstore
+    stores = [caches[DEFAULT_CACHE_ALIAS]]
+    if isinstance(kvstore, CachedDBKVStore):
+        stores.append(kvstore.cache)
+    return not any(isinstance(store, LocMemCache) for store in stores)
+
+
+def thumbnail_workers():
+    if not shared_cache():
+        return 0
+    return settings.THUMBNAIL_WORKERS
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                settings.THUMBNAIL_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=django.setup
+            )
+        return _executor
+
+
+def log_failure(future):
+    if future.exception() is not None:
+        logger.error('Не удалось создать миниатюры',
+                     exc_info=future.exception())
+
+
+def submit_thumbnails(name):
+    if not thumbnail_workers():
+        generate_thumbnails(name)
+        return
+    get_executor().submit(generate_thumbnails, name).add_done_callback(
+        log_failure
+    )
+
+
+def schedule_thumbnails(post):
+    if post.image:
+        name = post.image.name
+        transaction.on_commit(lambda: submit_thumbnails(name))
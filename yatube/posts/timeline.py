@@ -0,0 +1,143 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+
+from core.singleflight import start_refresh
+
+from .models import Follow, Post, TimelineEntry
+from .paginators import CursorPaginator
+from .sharding import ShardedQuerySet
+
+User = get_user_model()
+
+
+class TimelinePaginator(CursorPaginator):
+    def __init__(self, object_list, per_page, **kwargs):
+        super().__init__(object_list, per_page,
+                         ordering=('-pub_date', '-post'), **kwargs)
+
+    def transform(self, rows):
+        return [entry.post for entry in rows]
+
+
+def celebrity_authors(user):
+    over_limit = Follow.objects.filter(
+        author=OuterRef('author')
+    ).order_by().values('id')[
+        settings.TIMELINE_FANOUT_LIMIT:settings.TIMELINE_FANOUT_LIMIT + 1
+    ]
+    return list(
+        Follow.objects.filter(user=user).annotate(
+            over_limit=Subquery(over_limit)
+        ).filter(over_limit__isnull=False).values_list('author_id', flat=True)
+    )
+
+
+def timeline_paginator(user, per_page):
+    celebrities = celebrity_authors(user)
+    if not celebrities:
+        entries = TimelineEntry.objects.filter(
+            user=user
+        ).select_related('post__author', 'post__group')
+        return TimelinePaginator(entries, per_page)
+    return CursorPaginator(merged_timeline(user, celebrities), per_page,
+                           ordering=('-cursor_date', '-cursor_id'))
+
+
+def merged_timeline(user, celebrities):
+    """Лента пользователя, подписанного на авторов выше предела
+    рассылки: записи TimelineEntry по индексу (user, pub_date, post)
+    сливаются с постами каждого такого автора по индексу (author,
+    pub_date, id). Ключ курсора у всех частей — cursor_date, cursor_id."""
+    posts = Post.objects.select_related('author', 'group')
+    entries = posts.filter(timeline_entries__user=user).annotate(
+        cursor_date=F('timeline_entries__pub_date'),
+        cursor_id=F('timeline_entries__post')
+    )
+    return ShardedQuerySet([entries, *(
+        posts.filter(author_id=author_id).annotate(
+            cursor_date=F('pub_date'), cursor_id=F('id')
+        ) for author_id in celebrities
+    )], ordering=('-cursor_date', '-cursor_id'))
+
+
+def is_celebrity(author_id):
+    limit = settings.TIMELINE_FANOUT_LIMIT
+    return Follow.objects.filter(author_id=author_id)[limit:].exists()
+
+
+def fan_out(post):
+    followers = list(
+        Follow.objects.filter(
+            author_id=post.author_id
+        ).values_list('user_id', flat=True)[
+            :settings.TIMELINE_FANOUT_LIMIT + 1
+        ]
+    )
+    if len(followers) > settings.TIMELINE_FANOUT_LIMIT:
+        return
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+         for user_id in followers),
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def follow_author(user_id, author_id):
+    if is_celebrity(author_id):
+        return
+    fill_timeline(user_id, Post.objects.filter(author_id=author_id))
+
+
+def fill_timeline(user_id, posts):
+    posts = posts.values_list('id', 'pub_date')
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+         for post_id, pub_date in posts.iterator()),
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def unfollow_author(user_id, author_id):
+    TimelineEntry.objects.filter(
+        user_id=user_id,
+        post__author_id=author_id
+    ).delete()
+    limit = settings.TIMELINE_FANOUT_LIMIT
+    followers = Follow.objects.filter(author_id=author_id)[:limit + 1]
+    if followers.count() == limit:
+        transaction.on_commit(
+            lambda: start_refresh(lambda: backfill_author(author_id))
+        )
+
+
+def backfill_author(author_id):
+    """Автор опустился до TIMELINE_FANOUT_LIMIT подписчиков: ленты
+    больше не дочитывают его посты при чтении, поэтому посты, которые
+    не рассылались, и подписки, которые не заполнялись, пока автор был
+    выше предела, дописываются в ленты. Лента дополняется только до
+    своей самой старой записи: глубже ее и так не листают."""
+    followers = Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True)
+    for user_id in followers.iterator():
+        posts = Post.objects.filter(author_id=author_id)
+        oldest = TimelineEntry.objects.filter(user_id=user_id).order_by(
+            'pub_date'
+        ).values_list('pub_date', flat=True).first()
+        if oldest is not None:
+            posts = posts.filter(pub_date__gte=oldest)
+        fill_timeline(user_id, posts)
+
+
+def rebuild_timeline():
+    TimelineEntry.objects.all().delete()
+    follows = Follow.objects.order_by('author_id').values_list(
+        'user_id', 'author_id'
+    )
+    for user_id, author_id in follows.iterator():
+        follow_author(user_id, author_id)
+    return TimelineEntry.objects.count()
@@ -1,83 +1,211 @@
+import hashlib
+from http import HTTPStatus
+
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
 from django.contrib.auth import get_user_model
 from django.conf import settings
+from django.db import transaction
+from django.urls import reverse
+from django.utils.http import urlencode
+from django.views.decorators.http import condition
+
+from core.routers import replica_reads
+from core.singleflight import single_flight
 
+from .conditional import (group_state, index_state, page_condition,
+                          post_state, profile_state)
+from .feed_cache import (INDEX, GROUPS, feed_version, group_scope,
+                         profile_scope)
+from .feeds import (follow_count_list, follow_list, group_list, index_list,
+                    profile_list)
 from .forms import PostForm, CommentForm
-from .models import Post, Group, Follow
+from .fragments import (form_errors_response, forbidden_response,
+                        fragment_response, response_format)
+from .models import Group, Follow
+from .paginators import (CachedCountPaginator, CursorPaginator,
+                         SearchPaginator, dump_page, load_page)
+from .search import search_backend
+from .sharding import post_queryset, related
+from .stats import get_author_stats
+from .timeline import timeline_paginator
 
 User = get_user_model()
 
 
-def create_paginator(request, post_list):
-    paginator = Paginator(post_list, settings.NUMBER_OF_POSTS_DISPLAYED)
+def paginate(request, paginator):
+    before = request.GET.get('before')
+    after = request.GET.get('after')
+    if before or after:
+        return paginator.get_cursor_page(before=before, after=after)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return page_obj
 
 
+def count_cache(request, post_list, count_list=None):
+    """Ключ и версия числа записей ленты для CachedCountPaginator."""
+    state = getattr(request, '_page_state', None)
+    if state is None:
+        return None, None
+    queryset = post_list if count_list is None else count_list
+    raw = str(queryset.order_by().query)
+    return ('post_count:' + hashlib.md5(raw.encode()).hexdigest(),
+            '.'.join(str(version) for version in state[0]))
+
+
+def build_paginator(request, post_list, count_list=None, total=None):
+    count_key, count_version = count_cache(request, post_list, count_list)
+    return CachedCountPaginator(post_list,
+                                settings.NUMBER_OF_POSTS_DISPLAYED,
+                                count_key=count_key,
+                                count_version=count_version,
+                                count_list=count_list,
+                                total=total)
+
+
+def page_key(request, post_list, count_list=None, total=None):
+    state = getattr(request, '_page_state', None)
+    if state is None:
+        return None
+    raw = '|'.join([
+        str(post_list.query),
+        request.GET.get('page', ''),
+        request.GET.get('before', ''),
+        request.GET.get('after', ''),
+        '.'.join(str(version) for version in state[0]),
+    ])
+    return 'page_rows:' + hashlib.md5(raw.encode()).hexdigest()
+
+
+def restore_page(value, request, post_list, count_list=None, total=None):
+    return load_page(value, build_paginator(request, post_list, count_list,
+                                            total))
+
+
+@single_flight(page_key, dump=dump_page, load=restore_page)
+def create_paginator(request, post_list, count_list=None, total=None):
+    return paginate(request, build_paginator(request, post_list, count_list,
+                                             total))
+
+
+def comments_paginator(post):
+    return CursorPaginator(related(post.comments.all(), 'author'),
+                           settings.COMMENTS_PER_PAGE,
+                           ordering=('pub_date', 'id'))
+
+
+@replica_reads
+@condition(**page_condition(index_state))
 def index(request):
     template = 'posts/index.html'
-    post_list = Post.objects.select_related('author', 'group')
-    page_obj = create_paginator(request, post_list)
-    context = {'page_obj': page_obj, 'index': True}
+    page_obj = create_paginator(request, index_list())
+    context = {'page_obj': page_obj,
+               'index': True,
+               'feed_version': feed_version(INDEX),
+               'cache_timeout': settings.FEED_CACHE_TIMEOUT}
     return render(request, template, context)
 
 
+@replica_reads
+@condition(**page_condition(group_state))
 def group_posts(request, slug):
     template = 'posts/group_list.html'
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.select_related('author')
-    page_obj = create_paginator(request, post_list)
+    page_obj = create_paginator(request, group_list(group))
     context = {'group': group,
-               'page_obj': page_obj}
+               'page_obj': page_obj,
+               'feed_version': feed_version(group_scope(group.pk)),
+               'cache_timeout': settings.FEED_CACHE_TIMEOUT}
     return render(request, template, context)
 
 
+@replica_reads
+@condition(**page_condition(profile_state))
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.select_related('group')
-    count = post_list.count()
-    page_obj = create_paginator(request, post_list)
+    author = get_object_or_404(User.objects.select_related('stats'),
+                               username=username)
+    stats = get_author_stats(author)
+    page_obj = create_paginator(request, profile_list(author),
+                                total=stats.posts_count)
 
     following = request.user.is_authenticated and Follow.objects.filter(
         user=request.user,
         author=author).exists()
     context = {'author': author,
                'page_obj': page_obj,
-               'count': count,
-               'following': following}
+               'count': stats.posts_count,
+               'stats': stats,
+               'following': following,
+               'feed_version': feed_version(profile_scope(author.pk), GROUPS),
+               'cache_timeout': settings.FEED_CACHE_TIMEOUT}
     return render(request, 'posts/profile.html', context)
 
 
+@replica_reads
+@condition(**page_condition(post_state))
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    count = post.author.posts.count()
-    comments_list = post.comments.select_related('author')
+    post = get_object_or_404(
+        related(post_queryset(post_id), 'author__stats', 'group'),
+        pk=post_id
+    )
+    count = get_author_stats(post.author).posts_count
     context = {'post': post,
                'count': count,
-               'comments': comments_list,
+               'comments': comments_paginator(post).get_cursor_page(),
                'form': CommentForm(None)}
     return render(request, 'posts/post_detail.html', context)
 
 
+@replica_reads
+@condition(**page_condition(post_state))
+def post_comments(request, post_id):
+    post = get_object_or_404(post_queryset(post_id).only('id'),
+                             pk=post_id)
+    comments = comments_paginator(post).get_cursor_page(
+        before=request.GET.get('before'),
+        after=request.GET.get('after')
+    )
+    return render(request, 'posts/includes/comment_list.html',
+                  {'post': post, 'comments': comments})
+
+
+def post_fragment(request, fmt, post, status=HTTPStatus.OK):
+    return fragment_response(
+        request, fmt, 'posts/post.html',
+        {'post': post, 'show_link_group': True, 'show_link_profile': True},
+        {'id': post.pk, 'url': reverse('posts:post_detail', args=[post.pk])},
+        status
+    )
+
+
 @login_required
 def post_create(request):
+    fmt = response_format(request)
     form = PostForm(request.POST or None,
                     files=request.FILES or None)
     if form.is_valid():
         new_post = form.save(commit=False)
         new_post.author = request.user
-        new_post.save()
+        with transaction.atomic():
+            new_post.save()
+        if fmt:
+            return post_fragment(request, fmt, new_post, HTTPStatus.CREATED)
         return redirect('posts:profile', username=request.user.username)
+    if fmt and request.method == 'POST':
+        return form_errors_response(request, fmt, form)
     return render(request, 'posts/create_post.html', {'form': form})
 
 
 @login_required
 def post_edit(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    fmt = response_format(request)
+    post = get_object_or_404(
+        related(post_queryset(post_id), 'author', 'group'), pk=post_id
+    )
     if post.author != request.user:
+        if fmt:
+            return forbidden_response(fmt)
         return redirect('posts:post_detail', post_id=post_id)
     form = PostForm(
         request.POST or None,
@@ -86,7 +214,11 @@ def post_edit(request, post_id):
     )
     if form.is_valid() and request.method == 'POST':
         post.save()
+        if fmt:
+            return post_fragment(request, fmt, post)
         return redirect('posts:post_detail', post_id=post_id)
+    if fmt and request.method == 'POST':
+        return form_errors_response(request, fmt, form)
     return render(request,
                   'posts/create_post.html',
                   {'form': form, 'is_edit': True, 'post_id': post_id})
@@ -94,23 +226,35 @@ def post_edit(request, post_id):
 
 @login_required
 def add_comment(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    fmt = response_format(request)
+    post = get_object_or_404(post_queryset(post_id), pk=post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
         comment.save()
+        if fmt:
+            return fragment_response(
+                request, fmt, 'posts/includes/comment_item.html',
+                {'comment': comment}, {'id': comment.pk}, HTTPStatus.CREATED
+            )
+    elif fmt and request.method == 'POST':
+        return form_errors_response(request, fmt, form)
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@replica_reads
 @login_required
 def follow_index(request):
     template = 'posts/follow.html'
-    post_list = Post.objects.filter(
-        author__following__user=request.user
-    ).select_related('author', 'group')
-    page_obj = create_paginator(request, post_list)
+    if settings.TIMELINE_ENABLED:
+        paginator = timeline_paginator(request.user,
+                                       settings.NUMBER_OF_POSTS_DISPLAYED)
+        page_obj = paginate(request, paginator)
+    else:
+        page_obj = create_paginator(request, follow_list(request.user),
+                                    follow_count_list(request.user))
     context = {'page_obj': page_obj, 'follow': True}
     return render(request, template, context)
 
@@ -119,10 +263,11 @@ def follow_index(request):
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if author != request.user:
-        Follow.objects.get_or_create(
-            user=request.user,
-            author=author
-        )
+        with transaction.atomic():
+            Follow.objects.get_or_create(
+                user=request.user,
+                author=author
+            )
     return redirect('posts:profile', username=username)
 
 
@@ -131,3 +276,22 @@ def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     Follow.objects.filter(user=request.user, author=author).delete()
     return redirect('posts:profile', username=username)
+
+
+def search(request):
+    template = 'posts/search.html'
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+    query_prefix = ''
+    if query:
+        backend = search_backend()
+        post_list = backend.search(index_list(), query)
+        paginator = SearchPaginator(post_list,
+                                    settings.NUMBER_OF_POSTS_DISPLAYED,
+                                    backend)
+        page_obj = paginate(request, paginator)
+        query_prefix = urlencode({'q': query}) + '&'
+    context = {'query': query,
+               'page_obj': page_obj,
+               'query_prefix': query_prefix}
+    return render(request, template, context)
@@ -19,6 +19,7 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -35,7 +36,9 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'core.middleware.PrimaryStickinessMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'posts.middleware.AnonymousPageCacheMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
@@ -67,6 +70,20 @@ DATABASES = {
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
     }
 }
+DATABASE_ROUTERS = ['posts.sharding.ShardRouter',
+                    'core.routers.ReplicaRouter']
+READ_REPLICA_ALIAS = None
+REPLICA_STICKY_COOKIE = 'use_primary'
+REPLICA_STICKY_SECONDS = 10
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -105,6 +122,9 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 NUMBER_OF_POSTS_DISPLAYED = 10
+COMMENTS_PER_PAGE = 20
+API_PAGE_SIZE = 20
+API_BATCH_LIMIT = 100
 POST_STR_LIMIT = 15
 COMMENT_STR_LIMIT = 15
 
@@ -113,8 +133,70 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-CACHES = {
-    'default': {
+CACHE_BACKEND = 'locmem'
+CACHE_BACKENDS = {
+    'locmem': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    'sqlite': {
+        'BACKEND': 'core.cache_backends.sqlite.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+            'MAX_SIZE': 64 * 1024 * 1024,
+        },
+    },
+}
+CACHES = {
+    'default': CACHE_BACKENDS[CACHE_BACKEND]
+}
+FEED_CACHE_TIMEOUT = 60 * 60 * 6
+PAGE_CACHE_TIMEOUT = 60
+CARD_CACHE_TIMEOUT = FEED_CACHE_TIMEOUT
+COUNT_CACHE_TIMEOUT = FEED_CACHE_TIMEOUT
+COUNT_ESTIMATE_THRESHOLD = 10000
+COUNT_LOCK_TIMEOUT = 60
+PAGE_CACHE_STALE_TIMEOUT = 60 * 10
+PAGE_CACHE_LOCK_TIMEOUT = 30
+
+SINGLE_FLIGHT_TIMEOUT = FEED_CACHE_TIMEOUT
+SINGLE_FLIGHT_STALE_TIMEOUT = 60
+SINGLE_FLIGHT_LOCK_TIMEOUT = 10
+SINGLE_FLIGHT_WAIT = 2
+SINGLE_FLIGHT_POLL_INTERVAL = 0.01
+
+TIMELINE_ENABLED = False
+TIMELINE_FANOUT_LIMIT = 1000
+TIMELINE_BATCH_SIZE = 500
+
+POST_THUMBNAILS = {
+    '960x339': {'crop': 'center', 'upscale': True},
+}
+# Процессам миниатюр нужен общий кэш: с locmem миниатюры создаются
+# в процессе запроса после коммита.
+THUMBNAIL_WORKERS = 0 if CACHE_BACKEND == 'locmem' else 2
+THUMBNAIL_MISS_TIMEOUT = 60
+
+SEARCH_BACKEND = 'posts.search.SQLiteSearchBackend'
+
+# Алиасы баз-шардов для постов и комментариев (движок
+# core.db_backends.sqlite_shard). Пустой список — все в основной базе.
+# С шардами нужны TIMELINE_ENABLED = False и LikeSearchBackend.
+POST_SHARDS = []
+# id постов и комментариев в шардах: номер * POST_SHARD_ID_STRIDE + номер
+# шарда в POST_SHARDS. Новые шарды добавляются в конец списка, шардов
+# не больше POST_SHARD_ID_STRIDE.
+POST_SHARD_ID_STRIDE = 64
+POST_SHARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# bench_views: базовые значения и допустимый рост метрик — доля от
+# базового значения и абсолютная величина (мс, запросы, байты).
+# Регрессия — когда превышены обе.
+BENCH_BASELINE = os.path.join(BASE_DIR, 'bench_baseline.json')
+BENCH_THRESHOLDS = {
+    'p50': (0.5, 5),
+    'p95': (1.0, 10),
+    'p99': (2.0, 50),
+    'queries': (0, 0),
+    'bytes': (0.25, 16384),
 }